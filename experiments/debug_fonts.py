@@ -2,41 +2,113 @@
 
 import pymupdf
 from pathlib import Path
-from collections import Counter
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import json
+import re
+
+import numpy as np
+
+# All pattern-based heading checks fused into one alternation, in priority order:
+# CHAPTER prefix, short ALL-CAPS line (not a "***" banner), "N. " numbering, _underscored_.
+# Every branch is anchored on the leading characters so ordinary body text is rejected
+# within the first few characters (the caps length check stops at the first lowercase).
+HEADING_RE = re.compile(
+    r"(?P<chap>CHAPTER)"
+    r"|(?P<caps>(?!\*\*\*)(?=[^a-z]{6,79}\Z)[^a-z]*?[A-Z])"
+    r"|(?P<num>\d.{0,2}?\. )"
+    r"|(?P<und>_.*_\Z)",
+    re.DOTALL,
+)
+SKIP_RE = re.compile(r"illustration|copyright|printed", re.IGNORECASE)
+
+# Page extraction processes; the sampled pages are few, so sequential is the default
+# and a pool only pays off for larger samples
+WORKERS = 1
+
+
+def _extract_page_blocks(page):
+    """Extract the text blocks of a page."""
+    # Font details need "dict", but image blocks are dropped anyway so skip decoding them
+    flags = pymupdf.TEXTFLAGS_DICT & ~pymupdf.TEXT_PRESERVE_IMAGES
+    blocks = page.get_text("dict", flags=flags)["blocks"]
+    return [block for block in blocks if block["type"] == 0]
+
+
+def _extract_block_texts(page):
+    """Extract the concatenated text of each text block on a page."""
+    # Plain block tuples avoid building the per-span dicts of the "dict" output
+    texts = []
+    for x0, y0, x1, y1, text, block_no, block_type in page.get_text("blocks"):
+        if block_type != 0:
+            continue
+        # Lines come newline-separated; join them the same way spans were concatenated
+        texts.append(text.replace("\n", "").strip())
+    return texts
+
+
+def _extract_range(func, pdf_path, start, stop):
+    """Run a per-page extraction function over pages [start, stop), opening the PDF once."""
+    with pymupdf.open(pdf_path) as doc:
+        return [func(doc[page_num]) for page_num in range(start, stop)]
+
+
+def _map_pages(func, pdf_path, num_pages, workers=WORKERS):
+    """Run a per-page extraction function over the first num_pages pages, in page order."""
+    if workers <= 1:
+        return _extract_range(func, pdf_path, 0, num_pages)
+
+    # One contiguous page range per worker, so each process opens the PDF once
+    bounds = np.linspace(0, num_pages, workers + 1, dtype=int).tolist()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        ranges = executor.map(partial(_extract_range, func, pdf_path), bounds[:-1], bounds[1:])
+        return [page for pages in ranges for page in pages]
+
+
+def _value_counts(values):
+    """Count values with numpy, ordered like Counter.most_common() (count desc, then first seen)."""
+    uniques, first_idx, counts = np.unique(values, return_index=True, return_counts=True)
+    order = np.lexsort((first_idx, -counts))
+    return [(uniques[i].item(), int(counts[i])) for i in order]
+
 
 def analyze_fonts(pdf_path):
     """Deep dive into font properties across the PDF."""
-    doc = pymupdf.open(pdf_path)
+    with pymupdf.open(pdf_path) as doc:
+        num_pages = len(doc)
+
+    print(f"Analyzing {num_pages} pages...\n")
+
+    # Sample first 10 pages for detailed analysis; extract each page once
+    page_blocks = _map_pages(_extract_page_blocks, pdf_path, min(10, num_pages))
 
     all_font_info = []
+    for page_num, blocks in enumerate(page_blocks):
+        for block in blocks:
+            for line in block.get("lines", []):
+                for span in line.get("spans", []):
+                    all_font_info.append({
+                        "page": page_num,
+                        "text": span["text"],
+                        "size": round(span["size"], 2),
+                        "font": span["font"],
+                        "flags": span.get("flags", 0),
+                        "color": span.get("color", 0),
+                    })
 
-    print(f"Analyzing {len(doc)} pages...\n")
-
-    # Sample first 10 pages for detailed analysis
-    for page_num in range(min(10, len(doc))):
-        page = doc[page_num]
-        blocks = page.get_text("dict")["blocks"]
-
-        for block_idx, block in enumerate(blocks):
-            if block["type"] == 0:  # text block
-                for line in block.get("lines", []):
-                    for span in line.get("spans", []):
-                        all_font_info.append({
-                            "page": page_num,
-                            "text": span["text"],
-                            "size": round(span["size"], 2),
-                            "font": span["font"],
-                            "flags": span.get("flags", 0),
-                            "color": span.get("color", 0),
-                        })
+    # Group spans by size and font name in a single pass
+    by_size = defaultdict(list)
+    by_font = defaultdict(list)
+    for f in all_font_info:
+        by_size[f["size"]].append(f)
+        by_font[f["font"]].append(f)
 
     print("=" * 80)
     print("FONT SIZE DISTRIBUTION")
     print("=" * 80)
-    sizes = [f["size"] for f in all_font_info]
-    size_counter = Counter(sizes)
-    for size, count in size_counter.most_common():
+    sizes = np.fromiter((f["size"] for f in all_font_info), dtype=np.float64, count=len(all_font_info))
+    for size, count in _value_counts(sizes):
         print(f"  {size}pt: {count} spans")
 
     print("\n" + "=" * 80)
@@ -50,9 +122,8 @@ def analyze_fonts(pdf_path):
     print("\n" + "=" * 80)
     print("FONT FLAGS DISTRIBUTION (bold, italic, etc.)")
     print("=" * 80)
-    flags = [f["flags"] for f in all_font_info]
-    flag_counter = Counter(flags)
-    for flag, count in flag_counter.most_common():
+    flags = np.fromiter((f["flags"] for f in all_font_info), dtype=np.int32, count=len(all_font_info))
+    for flag, count in _value_counts(flags):
         # Decode flags
         is_bold = flag & 2**4
         is_italic = flag & 2**1
@@ -61,9 +132,9 @@ def analyze_fonts(pdf_path):
     print("\n" + "=" * 80)
     print("SAMPLE TEXT BY FONT SIZE (first 5 examples)")
     print("=" * 80)
-    for size in sorted(set(sizes), reverse=True):
-        samples = [f for f in all_font_info if f["size"] == size][:5]
-        print(f"\n{size}pt ({len([f for f in all_font_info if f['size'] == size])} total):")
+    for size in sorted(by_size, reverse=True):
+        samples = by_size[size][:5]
+        print(f"\n{size}pt ({len(by_size[size])} total):")
         for sample in samples:
             text_preview = sample["text"][:60].strip()
             if text_preview:
@@ -73,7 +144,7 @@ def analyze_fonts(pdf_path):
     print("SAMPLE TEXT BY FONT NAME")
     print("=" * 80)
     for font_name in font_counter.keys():
-        samples = [f for f in all_font_info if f["font"] == font_name][:3]
+        samples = by_font[font_name][:3]
         print(f"\n{font_name}:")
         for sample in samples:
             text_preview = sample["text"][:60].strip()
@@ -86,29 +157,25 @@ def analyze_fonts(pdf_path):
     print("=" * 80)
 
     # Group by block and analyze
-    doc = pymupdf.open(pdf_path)
-    for page_num in range(min(5, len(doc))):
-        page = doc[page_num]
-        blocks = page.get_text("dict")["blocks"]
-
+    for page_num, blocks in enumerate(page_blocks[:5]):
         for block in blocks:
-            if block["type"] == 0:
-                text = ""
-                for line in block.get("lines", []):
-                    for span in line.get("spans", []):
-                        text += span["text"]
+            text = ""
+            for line in block.get("lines", []):
+                for span in line.get("spans", []):
+                    text += span["text"]
 
-                text = text.strip()
-                if text and len(text) < 80 and len(text) > 10:
-                    # Get font info
-                    first_span = block["lines"][0]["spans"][0]
-                    print(f"\nPage {page_num}: '{text[:60]}'")
-                    print(f"  Font: {first_span['font']}, Size: {first_span['size']}, Flags: {first_span.get('flags', 0)}")
+            text = text.strip()
+            if text and len(text) < 80 and len(text) > 10:
+                # Get font info
+                first_span = block["lines"][0]["spans"][0]
+                print(f"\nPage {page_num}: '{text[:60]}'")
+                print(f"  Font: {first_span['font']}, Size: {first_span['size']}, Flags: {first_span.get('flags', 0)}")
 
 
 def detect_headings_by_pattern(pdf_path):
     """Detect headings using text patterns instead of font properties."""
-    doc = pymupdf.open(pdf_path)
+    with pymupdf.open(pdf_path) as doc:
+        num_pages = len(doc)
 
     print("\n" + "=" * 80)
     print("PATTERN-BASED HEADING DETECTION")
@@ -116,46 +183,36 @@ def detect_headings_by_pattern(pdf_path):
 
     headings = []
 
-    for page_num in range(min(20, len(doc))):
-        page = doc[page_num]
-        blocks = page.get_text("dict")["blocks"]
+    page_texts = _map_pages(_extract_block_texts, pdf_path, min(20, num_pages))
 
-        for block in blocks:
-            if block["type"] == 0:
-                text = ""
-                for line in block.get("lines", []):
-                    for span in line.get("spans", []):
-                        text += span["text"]
-
-                text = text.strip()
-
-                if not text or len(text) < 3:
-                    continue
+    for page_num, texts in enumerate(page_texts):
+        for text in texts:
+            if not text or len(text) < 3:
+                continue
 
-                # Heading heuristics for plain text PDFs
-                is_all_caps = text.isupper() and len(text) > 5
-                is_short = len(text) < 80
-                has_chapter = text.startswith("CHAPTER")
-                has_number_prefix = text[0].isdigit() and ". " in text[:5]
-                is_underscored = text.startswith("_") and text.endswith("_")
+            # Heading heuristics for plain text PDFs
+            is_short = len(text) < 80
+            m = HEADING_RE.match(text)
+            kind = m.lastgroup if m else None
 
-                heading_level = None
+            heading_level = None
 
-                if has_chapter or (is_all_caps and is_short and not text.startswith("***")):
-                    heading_level = "h1"
-                elif has_number_prefix and is_short:
+            if kind in ("chap", "caps"):
+                heading_level = "h1"
+            elif kind == "num":
+                if is_short:
                     heading_level = "h2"
-                elif is_underscored or (is_short and len(text) > 10 and text.count(" ") < 8):
-                    # Short lines that aren't just a few words
-                    if not any(skip in text.lower() for skip in ["illustration", "copyright", "printed"]):
-                        heading_level = "h3"
-
-                if heading_level:
-                    headings.append({
-                        "page": page_num,
-                        "level": heading_level,
-                        "text": text[:80]
-                    })
+            elif kind == "und" or (is_short and len(text) > 10 and text.count(" ") < 8):
+                # Short lines that aren't just a few words
+                if not SKIP_RE.search(text):
+                    heading_level = "h3"
+
+            if heading_level:
+                headings.append({
+                    "page": page_num,
+                    "level": heading_level,
+                    "text": text[:80]
+                })
 
     print(f"\nFound {len(headings)} potential headings:\n")
     for h in headings[:50]:
@@ -3,17 +3,20 @@ from pathlib import Path
 import dspy
 from dotenv import load_dotenv
 import os
+from gqa_common import process_in_order
 
 # --- Setup ---
 load_dotenv()
 openai_api_key = os.getenv("OPENAI_API_KEY")
 
+CONCURRENCY = 16  # max in-flight LLM requests
+
 lm = dspy.LM(
     "openai/gpt-4.1",   # or "openai/gpt-4o-mini" for faster/cheaper
     api_key=openai_api_key,
     temperature=0.0     # make answers deterministic
 )
-dspy.settings.configure(lm=lm)
+dspy.settings.configure(lm=lm, async_max_workers=CONCURRENCY)
 
 # --- Signature ---
 class AnswerGeneration(dspy.Signature):
@@ -22,6 +25,18 @@ class AnswerGeneration(dspy.Signature):
     question = dspy.InputField(desc="A well-formed question about the passage")
     answer = dspy.OutputField(desc="Concise, correct answer derived only from the passage")
 
+# --- Predictor ---
+# One shared predictor for every item; concurrent calls go through dspy.asyncify
+# (the same worker-thread pool Predict.batch / dspy.Parallel would use)
+predict_answer = dspy.Predict(AnswerGeneration)
+
+# No extra caching layer: dspy.LM caches every request on disk (keyed on the full
+# prompt and LM settings), so re-runs only pay for new or changed items
+def answer_question(ctx, q):
+    return predict_answer(context=ctx, question=q).answer.strip()
+
+gen_answer = dspy.asyncify(answer_question)
+
 # --- Main pipeline ---
 def main():
     input_path = Path("golden_qa_with_questions.json")
@@ -31,32 +46,24 @@ def main():
     with open(input_path, "r", encoding="utf-8") as f:
         dataset = json.load(f)
 
-    gen_answer = dspy.Predict(AnswerGeneration)
-
-    results = []
-    for i, item in enumerate(dataset, 1):
+    async def make_record(i, item):
         ctx = item["context"]
         q = item["question"]
 
         try:
-            a = gen_answer(context=ctx, question=q)
-            results.append({
-                "context": ctx,
-                "question": q,
-                "answer": a.answer.strip()
-            })
-            print(f"[{i}] Answer: {a.answer.strip()}")
+            answer = await gen_answer(ctx, q)
+            print(f"[{i}] Answer: {answer}")
         except Exception as e:
             print(f"[{i}] Error generating answer: {e}")
-            results.append({
-                "context": ctx,
-                "question": q,
-                "answer": ""
-            })
+            answer = ""
+
+        return {
+            "context": ctx,
+            "question": q,
+            "answer": answer
+        }
 
-    # Save final dataset
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
+    results = process_in_order(dataset, make_record, output_path, limit=CONCURRENCY)
 
     print(f"\nSaved {len(results)} items with answers → {output_path}")
 
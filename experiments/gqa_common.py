@@ -0,0 +1,63 @@
+"""Shared plumbing for the golden-QA generation scripts."""
+
+import asyncio
+import json
+from pathlib import Path
+
+
+async def _gather_bounded(coros, limit):
+    """Await coroutines with at most `limit` running at once, preserving order."""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(c) for c in coros))
+
+
+def process_in_order(dataset, make_record, output_path, limit):
+    """
+    Build one record per dataset item concurrently and save them in dataset order.
+
+    Records are streamed to JSON Lines as they finish (in dataset order) instead of
+    holding every result until the end; the JSONL doubles as a crash-safe log and
+    is compacted into a JSON array at output_path afterwards.
+
+    Args:
+        dataset: Items to process
+        make_record: Async function (i, item) -> record, with i counting from 1
+        output_path: Path of the final JSON array (the JSONL gets a .jsonl suffix)
+        limit: Max records being built at once
+
+    Returns:
+        The records, in dataset order
+    """
+    output_path = Path(output_path)
+    jsonl_path = output_path.with_suffix(".jsonl")
+
+    with open(jsonl_path, "w", encoding="utf-8") as out:
+        pending = {}  # finished records waiting for earlier items
+        next_i = 1
+
+        def write_in_order(i, record):
+            nonlocal next_i
+            pending[i] = record
+            while next_i in pending:
+                out.write(json.dumps(pending.pop(next_i), ensure_ascii=False) + "\n")
+                next_i += 1
+            out.flush()
+
+        async def run_one(i, item):
+            write_in_order(i, await make_record(i, item))
+
+        tasks = [run_one(i, item) for i, item in enumerate(dataset, 1)]
+        asyncio.run(_gather_bounded(tasks, limit=limit))
+
+    # Compact the JSONL into the final JSON array
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        results = [json.loads(line) for line in f]
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+    return results
@@ -14,31 +14,30 @@ OUTPUT_FILE = "golden_qa_data.json"
 # Regexes to catch move notation / tabular sequences
 MOVE_NUMBER_RE = re.compile(r"\d+\.\s*[A-Za-z]")
 MANY_SPACES_RE = re.compile(r"\s{10,}")  # lots of whitespace
-PIECE_SYMBOLS = {"P", "R", "B", "Q", "K", "Kt"}  # basic piece symbols
+SPLIT_RE = re.compile(r"\W+")
+PIECE_SYMBOLS = frozenset({"P", "R", "B", "Q", "K", "Kt"})  # basic piece symbols
 
 def looks_like_moves(text: str) -> bool:
     """Heuristic filter: true if the block looks like a chess move list."""
-    # Lots of numbered moves
-    if len(MOVE_NUMBER_RE.findall(text)) >= 3:
-        return True
-    # Big whitespace alignment
+    # Big whitespace alignment (cheapest check first)
     if MANY_SPACES_RE.search(text):
         return True
-    # If most tokens are piece codes
-    tokens = re.split(r"\W+", text)
-    piece_tokens = [t for t in tokens if t in PIECE_SYMBOLS]
-    if tokens and (len(piece_tokens) / len(tokens)) > 0.3:
+    # Lots of numbered moves - stop scanning once we've seen three
+    move_count = 0
+    for _ in MOVE_NUMBER_RE.finditer(text):
+        move_count += 1
+        if move_count >= 3:
+            return True
+    # If most tokens are piece codes (integer form of ratio > 0.3)
+    tokens = SPLIT_RE.split(text)
+    piece_count = sum(1 for t in tokens if t in PIECE_SYMBOLS)
+    n = len(tokens)
+    if n and piece_count * 10 > n * 3:
         return True
     return False
 
-# -------- MAIN --------
-def main():
-    with open(INPUT_FILE, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    blocks = data["blocks"]
-
-    candidates = []
+def filtered_iter(blocks):
+    """Yield block texts that pass the type/length/move-list filters."""
     for b in blocks:
         text = b.get("text", "").strip()
         if (
@@ -46,12 +45,29 @@ def main():
             and MIN_CHARS <= len(text) <= MAX_CHARS
             and not looks_like_moves(text)
         ):
-            candidates.append(text)
+            yield text
 
-    print(f"Found {len(candidates)} candidate text sections after filtering.")
+# -------- MAIN --------
+def main():
+    with open(INPUT_FILE, "r", encoding="utf-8") as f:
+        data = json.load(f)
 
+    blocks = data["blocks"]
+
+    # Reservoir sampling (Algorithm R): uniform sample in one pass, O(SAMPLE_SIZE) memory
     random.seed(SEED)
-    sampled = random.sample(candidates, min(SAMPLE_SIZE, len(candidates)))
+    sampled = []
+    num_candidates = 0
+    for i, text in enumerate(filtered_iter(blocks)):
+        num_candidates += 1
+        if i < SAMPLE_SIZE:
+            sampled.append(text)
+        else:
+            j = random.randint(0, i)
+            if j < SAMPLE_SIZE:
+                sampled[j] = text
+
+    print(f"Found {num_candidates} candidate text sections after filtering.")
 
     dataset = [{"context": ctx} for ctx in sampled]
 
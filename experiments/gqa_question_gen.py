@@ -3,23 +3,37 @@ from pathlib import Path
 import dspy
 from dotenv import load_dotenv
 import os
+from gqa_common import process_in_order
 
 load_dotenv()
 openai_api_key = os.getenv("OPENAI_API_KEY")
 
+CONCURRENCY = 16  # max in-flight LLM requests
+
 
 lm = dspy.LM(
     "openai/gpt-4.1",
     api_key=openai_api_key,
 )
 
-dspy.settings.configure(lm=lm)
+dspy.settings.configure(lm=lm, async_max_workers=CONCURRENCY)
 
 class QuestionGeneration(dspy.Signature):
     """Generate a clear, high-quality, learner-style question from the given chess context text."""
     context = dspy.InputField(desc="A passage from Capablanca's Chess Fundamentals")
     question = dspy.OutputField(desc="A well-formed question that can be answered from the passage")
 
+# One shared predictor for every item; concurrent calls go through dspy.asyncify
+# (the same worker-thread pool Predict.batch / dspy.Parallel would use)
+predict_question = dspy.Predict(QuestionGeneration)
+
+# No extra caching layer: dspy.LM caches every request on disk (keyed on the full
+# prompt and LM settings), so re-runs only pay for new or changed items
+def generate_question(ctx):
+    return predict_question(context=ctx).question.strip()
+
+gen_question = dspy.asyncify(generate_question)
+
 # --------- Main pipeline ---------
 def main():
     input_path = Path("golden_qa_data.json")
@@ -29,30 +43,22 @@ def main():
     with open(input_path, "r", encoding="utf-8") as f:
         dataset = json.load(f)
 
-    # Create DSPy predictor
-    gen_question = dspy.Predict(QuestionGeneration)
-
-    results = []
-    for i, item in enumerate(dataset, 1):
+    async def make_record(i, item):
         ctx = item["context"]
 
         try:
-            q = gen_question(context=ctx)
-            results.append({
-                "context": ctx,
-                "question": q.question.strip()
-            })
-            print(f"[{i}] Question: {q.question.strip()}")
+            question = await gen_question(ctx)
+            print(f"[{i}] Question: {question}")
         except Exception as e:
             print(f"[{i}] Error generating question: {e}")
-            results.append({
-                "context": ctx,
-                "question": ""
-            })
-
-    # Save results
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
+            question = ""
+
+        return {
+            "context": ctx,
+            "question": question
+        }
+
+    results = process_in_order(dataset, make_record, output_path, limit=CONCURRENCY)
 
     print(f"\nSaved {len(results)} items with questions → {output_path}")
 
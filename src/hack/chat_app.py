@@ -1,10 +1,11 @@
 """Streamlit chat interface for RAG agent demo."""
 
 import os
+import time
+import hashlib
 import dspy
 import streamlit as st
-from pathlib import Path
-from tempfile import NamedTemporaryFile
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from hack.rag_agent import create_agent
 from hack.pdf_processor import process_pdf
@@ -30,28 +31,73 @@ def initialize_dspy():
     dspy.configure(lm=lm)
 
 
-def create_agent_from_uploaded_pdf(uploaded_file):
-    """Process uploaded PDF and create agent with in-memory retriever."""
-    # Save uploaded file to temporary location
-    with NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-        tmp_file.write(uploaded_file.getbuffer())
-        tmp_path = Path(tmp_file.name)
+# Uploaded PDFs whose agents (each holding a whole FAISS index) stay cached across sessions
+UPLOADED_PDF_CACHE_SIZE = 4
 
-    try:
-        # Process PDF
-        with st.spinner("Processing PDF... This may take a minute."):
-            index, blocks, metadata = process_pdf(tmp_path, doc_id=uploaded_file.name)
 
-        # Create retriever with in-memory data
+class _PdfJob:
+    """Background processing of one uploaded PDF into an agent, with parse progress."""
+
+    def __init__(self, pdf_bytes: bytes, doc_id: str):
+        self.done = 0
+        self.total = 0
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.future = executor.submit(self._run, pdf_bytes, doc_id)
+        executor.shutdown(wait=False)
+
+    def _on_progress(self, done, total):
+        # Runs in the worker thread; only record state, script threads render it
+        self.done = done
+        self.total = total
+
+    def _run(self, pdf_bytes: bytes, doc_id: str):
+        # Process PDF straight from memory into an in-memory retriever
+        index, blocks, metadata = process_pdf(stream=pdf_bytes, doc_id=doc_id, progress_cb=self._on_progress)
         retriever = FaissRetriever(faiss_index=index, blocks=blocks)
+        return create_agent(retriever=retriever), metadata
+
+
+@st.cache_resource(max_entries=UPLOADED_PDF_CACHE_SIZE, show_spinner=False)
+def _pdf_job(pdf_hash: str, file_name: str, _pdf_bytes: bytes) -> _PdfJob:
+    """Start processing an uploaded PDF; one job per (content hash, file name), shared across sessions."""
+    return _PdfJob(_pdf_bytes, file_name)
+
 
-        # Create agent
-        agent = create_agent(retriever=retriever)
+def _wait_with_progress(job: _PdfJob):
+    """Show the job's per-page progress until it finishes, then return its result."""
+    bar = st.progress(0.0, text="Processing PDF...")
+    while not job.future.done():
+        done, total = job.done, job.total
+        if total and done < total:
+            bar.progress(done / total, text=f"Parsing page {done}/{total}...")
+        elif total:
+            bar.progress(1.0, text="Generating embeddings and building index...")
+        time.sleep(0.1)
+    bar.empty()
 
-        return agent, metadata
-    finally:
-        # Clean up temporary file
-        tmp_path.unlink(missing_ok=True)
+    return job.future.result()
+
+
+@st.cache_resource(show_spinner=False)
+def load_default_agent():
+    """Create the agent for the pre-indexed chess PDF (cached across sessions)."""
+    return create_agent()
+
+
+def create_agent_from_uploaded_pdf(uploaded_file):
+    """Process uploaded PDF and create agent with in-memory retriever."""
+    pdf_bytes = uploaded_file.getvalue()
+    pdf_hash = hashlib.sha256(pdf_bytes).hexdigest()
+
+    # Sessions uploading the same file share one job instead of processing it again
+    job = _pdf_job(pdf_hash, uploaded_file.name, pdf_bytes)
+    try:
+        return _wait_with_progress(job)
+    except Exception:
+        # Don't keep serving this failed job (other uploads stay cached); a retry
+        # processes the file again
+        _pdf_job.clear(pdf_hash, uploaded_file.name, pdf_bytes)
+        raise
 
 
 def initialize_messages():
@@ -117,7 +163,7 @@ def main():
         st.divider()
         if st.button("📚 Use Default Chess PDF", use_container_width=True):
             try:
-                st.session_state.agent = create_agent()
+                st.session_state.agent = load_default_agent()
                 st.session_state.pdf_metadata = {
                     "doc_id": "chess_pdf",
                     "num_pages": 95,
@@ -0,0 +1,46 @@
+"""Shared sentence-transformers encoder loading.
+
+Loading a model reads its weights from disk and initializes the torch modules,
+so instances are memoized per (model, device, precision) and shared between
+the PDF pipeline and retrievers.
+"""
+
+import torch
+from functools import lru_cache
+from sentence_transformers import SentenceTransformer
+from typing import Optional
+
+
+def get_device() -> str:
+    """Pick the fastest available torch device for encoding."""
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+@lru_cache(maxsize=4)
+def _load_encoder(model_name: str, device: str, fp16: bool) -> SentenceTransformer:
+    model = SentenceTransformer(model_name, device=device)
+    if fp16:
+        model.half()
+    model.eval()
+    return model
+
+
+def get_encoder(model_name: str, device: Optional[str] = None, fp16: bool = False) -> SentenceTransformer:
+    """
+    Get a (cached) sentence-transformers model.
+
+    Args:
+        model_name: Sentence-transformers model name
+        device: Torch device (defaults to get_device())
+        fp16: Convert weights to half precision
+
+    Returns:
+        Shared SentenceTransformer instance
+    """
+    if device is None:
+        device = get_device()
+    return _load_encoder(model_name, device, fp16)
@@ -0,0 +1,74 @@
+"""Page-level PDF text extraction.
+
+Kept free of torch/faiss/sentence-transformers imports: parse_pdf's worker
+processes import this module, and each worker pays for every import here.
+"""
+
+import pymupdf
+from typing import Dict, List, Optional
+from pathlib import Path
+
+
+# Default "dict" flags minus image extraction: image blocks are discarded anyway,
+# and preserving them decodes and copies every image's bytes into Python
+TEXT_BLOCK_FLAGS = pymupdf.TEXTFLAGS_DICT & ~pymupdf.TEXT_PRESERVE_IMAGES
+
+
+def extract_text_blocks(page):
+    """Extract text blocks with bounding boxes from a page."""
+    text_blocks = []
+    blocks = page.get_text("dict", flags=TEXT_BLOCK_FLAGS)["blocks"]
+
+    for block_idx, block in enumerate(blocks):
+        if block["type"] == 0:  # text block
+            bbox = block["bbox"]
+            parts = []
+
+            # Collect font info from first span
+            font_size = None
+            font_name = None
+            is_bold = False
+
+            for line in block.get("lines", []):
+                for span in line.get("spans", []):
+                    if font_size is None:
+                        font_size = span.get("size", 10.0)
+                        font_name = span.get("font", "Unknown")
+                        is_bold = "Bold" in font_name
+                    parts.append(span["text"])
+                parts.append("\n")
+
+            text_blocks.append({
+                "block_id": block_idx,
+                "bbox": bbox,
+                "text": "".join(parts).strip(),
+                "font_size": font_size or 10.0,
+                "font_name": font_name or "Unknown",
+                "is_bold": is_bold
+            })
+
+    return text_blocks
+
+
+def open_pdf(pdf_path: Optional[Path] = None, stream: Optional[bytes] = None) -> pymupdf.Document:
+    """Open a PDF from a file path or from in-memory bytes."""
+    if stream is not None:
+        return pymupdf.open(stream=stream, filetype="pdf")
+    if pdf_path is None:
+        raise ValueError("Must provide either pdf_path or stream")
+    return pymupdf.open(pdf_path)
+
+
+# The PDF opened by init_page_worker, in page worker processes only
+_worker_doc: Optional[pymupdf.Document] = None
+
+
+def init_page_worker(pdf_path: Optional[Path], stream: Optional[bytes]) -> None:
+    """Process pool initializer: open the PDF once per worker, so its bytes are sent once."""
+    global _worker_doc
+    _worker_doc = open_pdf(pdf_path, stream=stream)
+
+
+def extract_page_range(start: int, stop: int) -> List[List[Dict]]:
+    """Extract text blocks for pages [start, stop) of the PDF opened by init_page_worker."""
+    return [extract_text_blocks(_worker_doc[page_num]) for page_num in range(start, stop)]
@@ -7,102 +7,126 @@ This module combines the notebook experiments into a reusable pipeline:
 4. Build FAISS index for semantic search
 """
 
+import json
+import multiprocessing
+import queue
+import re
+import threading
 import pymupdf
 import numpy as np
 import faiss
-from sentence_transformers import SentenceTransformer
-from typing import Dict, List, Optional
+import torch
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from pathlib import Path
+from sentence_transformers import SentenceTransformer
+from hack.encoder import get_device, get_encoder
+from hack.pdf_pages import extract_page_range, extract_text_blocks, init_page_worker, open_pdf
+
+
+# Copyright/license boilerplate markers, matched in one pass per block
+SKIP_PATTERNS = [
+    "project gutenberg",
+    "copyright",
+    "license",
+    "www.gutenberg.org",
+    "ebook",
+]
+SKIP_RE = re.compile("|".join(map(re.escape, SKIP_PATTERNS)), re.IGNORECASE)
+# Case-sensitive variant for already lowercased text; IGNORECASE matching is ~3x slower
+_SKIP_LOWER_RE = re.compile("|".join(map(re.escape, SKIP_PATTERNS)))
+
+# Below this many vectors exact flat search is fast enough; "auto" switches to HNSW above it
+HNSW_MIN_VECTORS = 10_000
+INDEX_TYPES = ("auto", "flat", "sq8", "hnsw", "ivfpq")
+
+# IVF-PQ trains about 4*sqrt(N) clusters, capped so each gets the IVFPQ_POINTS_PER_CLUSTER
+# training points FAISS asks for; below IVFPQ_MIN_VECTORS exact flat search is fast
+# enough that quantization isn't worth its recall loss
+IVFPQ_MIN_VECTORS = 10_000
+IVFPQ_POINTS_PER_CLUSTER = 39
+# 4-bit FastScan product-quantizer sub-vectors; the dimension must divide evenly
+IVFPQ_SUBQUANTIZERS = 32
+
+# Page workers are spawned rather than forked: callers (the Streamlit app, process_pdf's
+# producer thread, torch) already run threads, which fork would copy mid-state
+PAGE_WORKER_CONTEXT = multiprocessing.get_context("spawn")
+
+# Each page worker gets this many page ranges, so the first pages are ready (and
+# yielded in order) long before the last range finishes
+RANGES_PER_WORKER = 4
+
+# process_pdf encodes queued texts once this many have arrived from the page parser:
+# small enough to start encoding after the first few pages, large enough for
+# encode()'s length sorting to keep batches evenly padded
+ENCODE_CHUNK_SIZE = 256
+# Pages the parser may run ahead of the encoder, bounding the blocks held in memory
+PAGE_QUEUE_SIZE = 16
+
+
+def _skip_pattern_mask(texts: List[str]) -> np.ndarray:
+    """
+    Flag texts containing a SKIP_PATTERNS marker with a single regex scan.
 
+    Texts are joined with NUL separators (no pattern contains NUL, so matches
+    cannot span two texts) and match positions are mapped back to text indices.
+    """
+    lens = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    # Text i occupies [starts[i], starts[i] + lens[i]) in the joined string
+    starts = np.concatenate(([0], np.cumsum(lens[:-1] + 1)))
+
+    joined = "\0".join(texts)
+    lowered = joined.lower()
+    if len(lowered) == len(joined):
+        matches = _SKIP_LOWER_RE.finditer(lowered)
+    else:
+        # Some characters lowercase to several, which would shift offsets
+        matches = SKIP_RE.finditer(joined)
+    match_starts = np.fromiter((m.start() for m in matches), dtype=np.int64)
 
-def extract_text_blocks(page):
-    """Extract text blocks with bounding boxes from a page."""
-    text_blocks = []
-    blocks = page.get_text("dict")["blocks"]
-
-    for block_idx, block in enumerate(blocks):
-        if block["type"] == 0:  # text block
-            bbox = block["bbox"]
-            text = ""
-
-            # Collect font info from first span
-            font_size = None
-            font_name = None
-            is_bold = False
-
-            for line in block.get("lines", []):
-                for span in line.get("spans", []):
-                    if font_size is None:
-                        font_size = span.get("size", 10.0)
-                        font_name = span.get("font", "Unknown")
-                        is_bold = "Bold" in font_name
-                    text += span["text"]
-                text += "\n"
-
-            text_blocks.append({
-                "block_id": block_idx,
-                "bbox": bbox,
-                "text": text.strip(),
-                "font_size": font_size or 10.0,
-                "font_name": font_name or "Unknown",
-                "is_bold": is_bold
-            })
-
-    return text_blocks
+    mask = np.zeros(len(texts), dtype=bool)
+    mask[np.searchsorted(starts, match_starts, side="right") - 1] = True
+    return mask
 
 
-def classify_block_type(block: Dict, font_sizes: List[float]) -> str:
+def classify_blocks(blocks: List[Dict]) -> List[str]:
     """
-    Classify block type based on font size and content.
+    Classify all blocks of a document at once by font size and content.
+
+    Font size percentiles are computed over the given blocks.
 
-    Returns: 'h1', 'h2', 'h3', 'body', or 'skip'
+    Returns: List of 'h1', 'h2', 'h3', 'body', or 'skip', one per block
     """
-    font_size = block["font_size"]
-    text = block["text"]
-    char_count = len(text)
-
-    # Skip very short blocks or boilerplate
-    if char_count < 3:
-        return "skip"
-
-    # Skip copyright/license text patterns
-    skip_patterns = [
-        "project gutenberg",
-        "copyright",
-        "license",
-        "www.gutenberg.org",
-        "ebook",
-    ]
-    text_lower = text.lower()
-    if any(pattern in text_lower for pattern in skip_patterns) and char_count < 600:
-        return "skip"
+    if not blocks:
+        return []
 
-    # Compute font size percentiles for heading detection
-    if len(font_sizes) > 0:
-        p75 = np.percentile(font_sizes, 75)
-        p90 = np.percentile(font_sizes, 90)
-        p95 = np.percentile(font_sizes, 95)
+    # Structure-of-arrays view of the block attributes used for classification
+    sizes = np.fromiter((b["font_size"] for b in blocks), dtype=np.float64, count=len(blocks))
+    lens = np.fromiter((len(b["text"]) for b in blocks), dtype=np.int64, count=len(blocks))
+    has_skip_pattern = _skip_pattern_mask([b["text"] for b in blocks])
 
-        # Heading classification
-        if font_size >= p95:
-            return "h1"
-        elif font_size >= p90:
-            return "h2"
-        elif font_size >= p75 and char_count < 100:
-            return "h3"
+    p75, p90, p95 = np.percentile(sizes, [75, 90, 95])
 
-    # Default to body text
-    return "body"
+    types = np.select(
+        [
+            (lens < 3) | (has_skip_pattern & (lens < 600)),
+            sizes >= p95,
+            sizes >= p90,
+            (sizes >= p75) & (lens < 100),
+        ],
+        ["skip", "h1", "h2", "h3"],
+        default="body",
+    )
+    return types.tolist()
 
 
 def build_section_hierarchy(blocks: List[Dict]) -> List[Dict]:
     """
     Build section hierarchy and add section paths to blocks.
 
-    Tracks h1/h2/h3 headings and assigns section_path to each block.
+    Tracks h1/h2/h3 headings and assigns section_path to each block in place.
     """
     section_stack = []  # Stack of (level, title) tuples
-    enhanced_blocks = []
 
     for block in blocks:
         block_type = block["type"]
@@ -122,158 +146,492 @@ def build_section_hierarchy(blocks: List[Dict]) -> List[Dict]:
         # Build section path from stack
         section_path = " > ".join(s[1] for s in section_stack) if section_stack else None
 
-        enhanced_block = block.copy()
-        enhanced_block["section_path"] = section_path
-        enhanced_blocks.append(enhanced_block)
+        block["section_path"] = section_path
 
-    return enhanced_blocks
+    return blocks
 
 
-def parse_pdf(pdf_path: Path, doc_id: str = "uploaded_pdf") -> Dict:
+def _extract_pages_parallel(
+    pdf_path: Optional[Path],
+    stream: Optional[bytes],
+    num_pages: int,
+    workers: int,
+    progress_cb: Optional[Callable[[int, int], None]] = None
+) -> Iterator[List[Dict]]:
     """
-    Parse PDF and extract structured blocks with metadata.
+    Extract text blocks for all pages using a process pool, yielding pages in order.
+
+    PyMuPDF documents are not thread-safe and parsing holds the GIL, so each
+    worker opens the PDF once (receiving stream bytes once, at startup) and
+    extracts contiguous ranges of pages. Workers
+    only import hack.pdf_pages (plus, being spawned, the caller's __main__
+    module), but still take a fraction of a second to start, so this only pays
+    off for long documents on several cores.
 
     Args:
         pdf_path: Path to PDF file
-        doc_id: Document identifier
+        stream: In-memory PDF bytes (used instead of pdf_path when given)
+        num_pages: Total number of pages in the document
+        workers: Number of worker processes
+        progress_cb: Called as progress_cb(pages_done, total_pages) after each range
 
-    Returns:
-        Workspace dictionary with blocks
+    Yields:
+        Text blocks for one page, as soon as it and all earlier pages are extracted
+    """
+    num_ranges = min(num_pages, workers * RANGES_PER_WORKER)
+    bounds = np.linspace(0, num_pages, num_ranges + 1).astype(int)
+
+    pages_done = 0
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=PAGE_WORKER_CONTEXT,
+        initializer=init_page_worker,
+        initargs=(pdf_path, stream),
+    )
+    with executor:
+        futures = [
+            executor.submit(extract_page_range, int(start), int(stop))
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+        try:
+            for future in futures:
+                chunk = future.result()
+
+                pages_done += len(chunk)
+                if progress_cb is not None:
+                    progress_cb(pages_done, num_pages)
+
+                yield from chunk
+        finally:
+            # Don't parse the remaining ranges if the caller stopped early
+            for future in futures:
+                future.cancel()
+
+
+def iter_page_blocks(
+    pdf_path: Optional[Path] = None,
+    stream: Optional[bytes] = None,
+    progress_cb: Optional[Callable[[int, int], None]] = None,
+    workers: int = 1
+) -> Iterator[List[Dict]]:
     """
-    doc = pymupdf.open(pdf_path)
+    Yield the text blocks of each page, in page order, as they are extracted.
+
+    Args:
+        pdf_path: Path to PDF file
+        stream: In-memory PDF bytes (used instead of pdf_path when given)
+        progress_cb: Called as progress_cb(pages_done, total_pages) as pages are extracted
+        workers: Worker processes for page extraction (default 1: sequential in
+            this process)
+
+    Yields:
+        List of blocks for one page, tagged with page_num and char_count
+    """
+    doc = open_pdf(pdf_path, stream=stream)
+    try:
+        num_pages = len(doc)
+        workers = min(workers, num_pages)
+
+        if workers > 1:
+            page_results = _extract_pages_parallel(pdf_path, stream, num_pages, workers, progress_cb)
+        else:
+            page_results = _extract_pages_sequential(doc, progress_cb)
+
+        for page_num, page_blocks in enumerate(page_results):
+            for block in page_blocks:
+                block["page_num"] = page_num
+                block["char_count"] = len(block["text"])
+            yield page_blocks
+    finally:
+        doc.close()
 
-    # First pass: extract all text blocks from all pages
-    all_blocks = []
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        page_blocks = extract_text_blocks(page)
 
-        for block in page_blocks:
-            block["page_num"] = page_num
-            block["char_count"] = len(block["text"])
-            all_blocks.append(block)
+def _extract_pages_sequential(
+    doc: pymupdf.Document,
+    progress_cb: Optional[Callable[[int, int], None]] = None
+) -> Iterator[List[Dict]]:
+    """Lazily extract text blocks page by page from an open document."""
+    num_pages = len(doc)
+    for page_num in range(num_pages):
+        page_blocks = extract_text_blocks(doc[page_num])
 
-    # Collect font sizes for classification
-    font_sizes = [b["font_size"] for b in all_blocks]
+        if progress_cb is not None:
+            progress_cb(page_num + 1, num_pages)
 
-    # Second pass: classify block types
-    for block in all_blocks:
-        block["type"] = classify_block_type(block, font_sizes)
+        yield page_blocks
 
-    # Third pass: build section hierarchy
+
+def _structure_blocks(all_blocks: List[Dict], doc_id: str, num_pages: int) -> Dict:
+    """Classify extracted blocks, attach section paths and wrap them in a workspace."""
+    # Classify block types
+    for block, block_type in zip(all_blocks, classify_blocks(all_blocks)):
+        block["type"] = block_type
+
+    # Build section hierarchy
     all_blocks = build_section_hierarchy(all_blocks)
 
     # Re-index blocks with consistent IDs
     for idx, block in enumerate(all_blocks):
         block["block_idx"] = idx
 
-    workspace = {
+    return {
         "doc_id": doc_id,
-        "num_pages": len(doc),
+        "num_pages": num_pages,
         "blocks": all_blocks
     }
 
-    doc.close()
+
+def parse_pdf(
+    pdf_path: Optional[Path] = None,
+    doc_id: str = "uploaded_pdf",
+    stream: Optional[bytes] = None,
+    progress_cb: Optional[Callable[[int, int], None]] = None,
+    workers: int = 1
+) -> Dict:
+    """
+    Parse PDF and extract structured blocks with metadata.
+
+    Args:
+        pdf_path: Path to PDF file
+        doc_id: Document identifier
+        stream: In-memory PDF bytes (used instead of pdf_path when given)
+        progress_cb: Called as progress_cb(pages_done, total_pages) as pages are extracted
+        workers: Worker processes for page extraction, see iter_page_blocks
+
+    Returns:
+        Workspace dictionary with blocks
+    """
+    all_blocks = []
+    num_pages = 0
+    for page_blocks in iter_page_blocks(pdf_path, stream=stream, progress_cb=progress_cb, workers=workers):
+        all_blocks.extend(page_blocks)
+        num_pages += 1
+
+    return _structure_blocks(all_blocks, doc_id, num_pages)
+
+
+def _embedding_text(block: Dict) -> Optional[str]:
+    """Text to embed for a block, or None if it is too short to be useful."""
+    if not block.get('text') or len(block['text'].strip()) < 3:
+        return None
+    return block['text'].replace("\n", " ")
+
+
+def _encode_texts(model: SentenceTransformer, texts: List[str], batch_size: int) -> np.ndarray:
+    """Encode texts into a float32 (N, D) matrix."""
+    if len(texts) == 0:
+        return np.empty((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+    # encode() sorts texts by length so each batch pads to similar lengths,
+    # and restores the original order after
+    with torch.inference_mode():
+        embeddings = model.encode(
+            texts,
+            batch_size=batch_size,
+            show_progress_bar=False,
+            convert_to_numpy=True
+        )
+    # fp16 models return float16 arrays; FAISS expects float32
+    return embeddings.astype(np.float32, copy=False)
+
+
+def _attach_embeddings(workspace: Dict, embeddings: np.ndarray, text_indices: List[Optional[int]]) -> Dict:
+    """Store the embedding matrix in the workspace and point each block at its row."""
+    # Row views into the matrix (no per-float Python objects)
+    for block, row in zip(workspace["blocks"], text_indices):
+        block['embedding'] = None if row is None else embeddings[row]
+
+    workspace["_emb_matrix"] = embeddings
+    workspace["_emb_index_map"] = text_indices
     return workspace
 
 
-def generate_embeddings(workspace: Dict, model_name: str = "all-MiniLM-L6-v2", batch_size: int = 32) -> Dict:
+def _load_model(
+    model_name: str,
+    batch_size: Optional[int],
+    device: Optional[str]
+) -> Tuple[SentenceTransformer, int]:
+    """Get the shared encoder and a batch size suited to its device."""
+    if device is None:
+        device = get_device()
+    if batch_size is None:
+        batch_size = 32 if device == "cpu" else 256
+
+    # fp16 on CUDA: weights/activations use tensor cores and halve memory traffic
+    return get_encoder(model_name, device=device, fp16=(device == "cuda")), batch_size
+
+
+def generate_embeddings(
+    workspace: Dict,
+    model_name: str = "all-MiniLM-L6-v2",
+    batch_size: Optional[int] = None,
+    device: Optional[str] = None
+) -> Dict:
     """
     Generate embeddings for all blocks in workspace.
 
     Args:
         workspace: Workspace dictionary from parse_pdf
         model_name: Sentence-transformers model name
-        batch_size: Batch size for encoding
+        batch_size: Batch size for encoding (defaults to 256 on GPU, 32 on CPU)
+        device: Torch device to encode on (defaults to CUDA/MPS when available)
 
     Returns:
-        Enhanced workspace with embeddings added to each block
+        Workspace with embeddings added to each block in place. The embeddings are
+        also kept as one contiguous float32 matrix in workspace["_emb_matrix"], with
+        workspace["_emb_index_map"] giving each block's row (None if not embedded).
     """
-    model = SentenceTransformer(model_name)
-    blocks = workspace["blocks"]
+    model, batch_size = _load_model(model_name, batch_size, device)
 
     # Collect texts to embed
     texts_to_embed = []
     text_indices = []
 
-    for i, block in enumerate(blocks):
-        if not block.get('text') or len(block['text'].strip()) < 3:
+    for block in workspace["blocks"]:
+        text = _embedding_text(block)
+        if text is None:
             text_indices.append(None)
         else:
             text_indices.append(len(texts_to_embed))
-            texts_to_embed.append(block['text'].replace("\n", " "))
+            texts_to_embed.append(text)
 
-    # Generate embeddings
-    if len(texts_to_embed) > 0:
-        embeddings = model.encode(
-            texts_to_embed,
-            batch_size=batch_size,
-            show_progress_bar=False,
-            convert_to_numpy=True
-        )
-    else:
-        embeddings = np.array([])
+    # Pass all texts in one call so encode() can length-sort across the whole document
+    embeddings = _encode_texts(model, texts_to_embed, batch_size)
 
-    # Add embeddings to blocks
-    enhanced_blocks = []
-    for i, block in enumerate(blocks):
-        enhanced_block = block.copy()
+    return _attach_embeddings(workspace, embeddings, text_indices)
+
+
+def _parse_and_embed(
+    pdf_path: Optional[Path],
+    doc_id: str,
+    model_name: str,
+    stream: Optional[bytes],
+    progress_cb: Optional[Callable[[int, int], None]],
+    workers: int = 1
+) -> Dict:
+    """
+    Parse a PDF and embed its blocks, encoding while later pages are still parsed.
 
-        if text_indices[i] is None:
-            enhanced_block['embedding'] = None
+    A producer thread extracts pages and queues their blocks, at most
+    PAGE_QUEUE_SIZE pages ahead; this thread encodes the queued texts every
+    ENCODE_CHUNK_SIZE texts, so parsing on the CPU overlaps with encoding
+    (which releases the GIL inside torch).
+
+    Returns:
+        Workspace equivalent to generate_embeddings(parse_pdf(...))
+    """
+    model, batch_size = _load_model(model_name, None, None)
+    page_queue: queue.Queue = queue.Queue(maxsize=PAGE_QUEUE_SIZE)
+    done = object()
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for page_blocks in iter_page_blocks(pdf_path, stream=stream, progress_cb=progress_cb, workers=workers):
+                if stop.is_set():
+                    return
+                page_queue.put(page_blocks)
+        except BaseException as e:
+            page_queue.put(e)
         else:
-            enhanced_block['embedding'] = embeddings[text_indices[i]].tolist()
+            page_queue.put(done)
 
-        enhanced_blocks.append(enhanced_block)
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
 
-    workspace["blocks"] = enhanced_blocks
-    return workspace
+    all_blocks = []
+    num_pages = 0
+    text_indices = []
+    pending_texts = []
+    embedding_chunks = []
+    num_texts = 0
+
+    try:
+        while (page_blocks := page_queue.get()) is not done:
+            if isinstance(page_blocks, BaseException):
+                raise page_blocks
+
+            num_pages += 1
+            for block in page_blocks:
+                text = _embedding_text(block)
+                if text is None:
+                    text_indices.append(None)
+                else:
+                    text_indices.append(num_texts)
+                    pending_texts.append(text)
+                    num_texts += 1
+                all_blocks.append(block)
+
+            if len(pending_texts) >= ENCODE_CHUNK_SIZE:
+                embedding_chunks.append(_encode_texts(model, pending_texts, batch_size))
+                pending_texts = []
+    finally:
+        # If encoding failed, free a producer blocked on the full queue so it can stop
+        stop.set()
+        while producer.is_alive():
+            try:
+                page_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    embedding_chunks.append(_encode_texts(model, pending_texts, batch_size))
+    embeddings = np.concatenate(embedding_chunks)
+
+    workspace = _structure_blocks(all_blocks, doc_id, num_pages)
+    return _attach_embeddings(workspace, embeddings, text_indices)
+
+
+def save_workspace(workspace: Dict, json_path: Path) -> None:
+    """
+    Save an embedded workspace as block metadata JSON plus a binary embedding matrix.
+
+    Embeddings go to a float32 .npy file next to the JSON (same name, .npy suffix)
+    instead of being written as JSON floats. The JSON records each block's matrix
+    row under "embedding_rows" (None for blocks without an embedding).
+
+    Args:
+        workspace: Workspace from generate_embeddings
+        json_path: Output path for the metadata JSON
+    """
+    json_path = Path(json_path)
+    metadata = {k: v for k, v in workspace.items() if k != "blocks" and not k.startswith("_")}
+    metadata["blocks"] = [
+        {k: v for k, v in block.items() if k != "embedding"}
+        for block in workspace["blocks"]
+    ]
+    metadata["embedding_rows"] = workspace["_emb_index_map"]
+
+    with open(json_path, "w") as f:
+        json.dump(metadata, f)
+    np.save(json_path.with_suffix(".npy"), np.ascontiguousarray(workspace["_emb_matrix"], dtype=np.float32))
 
 
-def build_faiss_index(workspace: Dict) -> tuple[faiss.Index, List[Dict]]:
+def load_workspace(json_path: Path, mmap: bool = True) -> Dict:
+    """
+    Load a workspace written by save_workspace.
+
+    The metadata JSON alone (without its .npy) is enough for FaissRetriever, whose
+    index holds the vectors, but not for this function.
+
+    Args:
+        json_path: Path to the metadata JSON
+        mmap: Memory-map the embedding matrix instead of reading it into RAM
+
+    Returns:
+        Workspace shaped like generate_embeddings output
+
+    Raises:
+        FileNotFoundError: If the embedding matrix next to the JSON is missing
+    """
+    json_path = Path(json_path)
+    npy_path = json_path.with_suffix(".npy")
+    if not npy_path.exists():
+        raise FileNotFoundError(
+            f"Embedding matrix not found at {npy_path}; {json_path} is block metadata only "
+            "(load it with FaissRetriever, or re-run process_pdf to regenerate the embeddings)"
+        )
+
+    with open(json_path, "r") as f:
+        workspace = json.load(f)
+
+    embeddings = np.load(npy_path, mmap_mode="r" if mmap else None)
+    return _attach_embeddings(workspace, embeddings, workspace.pop("embedding_rows"))
+
+
+def create_faiss_index(embeddings: np.ndarray, index_type: str = "auto") -> faiss.Index:
+    """
+    Create an inner-product FAISS index over normalized embeddings.
+
+    Args:
+        embeddings: (N, D) float32 matrix of L2-normalized vectors
+        index_type: 'flat' (exact), 'sq8' (exhaustive over int8-quantized vectors,
+            4x smaller than flat), 'hnsw' (graph), 'ivfpq' (quantized, FastScan;
+            flat below IVFPQ_MIN_VECTORS vectors), or 'auto' (flat below
+            HNSW_MIN_VECTORS vectors, HNSW above)
+
+    Returns:
+        FAISS index containing the embeddings
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index_type {index_type!r}, expected one of {INDEX_TYPES}")
+
+    num_vectors, dimension = embeddings.shape
+    if index_type == "auto":
+        index_type = "flat" if num_vectors < HNSW_MIN_VECTORS else "hnsw"
+    elif index_type == "ivfpq":
+        if dimension % IVFPQ_SUBQUANTIZERS:
+            raise ValueError(
+                f"ivfpq needs an embedding dimension divisible by {IVFPQ_SUBQUANTIZERS}, got {dimension}"
+            )
+        if num_vectors < IVFPQ_MIN_VECTORS:
+            index_type = "flat"
+
+    if index_type == "flat":
+        index = faiss.IndexFlatIP(dimension)
+    elif index_type == "sq8":
+        index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, 32, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = 200
+        index.hnsw.efSearch = 64
+    else:
+        nlist = min(int(4 * np.sqrt(num_vectors)), num_vectors // IVFPQ_POINTS_PER_CLUSTER)
+        index = faiss.index_factory(
+            dimension, f"IVF{nlist},PQ{IVFPQ_SUBQUANTIZERS}x4fs", faiss.METRIC_INNER_PRODUCT
+        )
+        index.train(embeddings)
+        index.nprobe = max(1, nlist // 16)
+
+    index.add(embeddings)
+    return index
+
+
+def build_faiss_index(workspace: Dict, index_type: str = "auto") -> tuple[faiss.Index, List[Dict]]:
     """
     Build FAISS index from workspace embeddings.
 
     Args:
-        workspace: Workspace with embeddings
+        workspace: Workspace with embeddings (removed from its blocks in place;
+            workspace["_emb_matrix"] is left untouched)
+        index_type: FAISS index kind, see create_faiss_index
 
     Returns:
         Tuple of (FAISS index, list of valid blocks without embeddings)
     """
-    # Extract embeddings and valid blocks
-    embeddings = []
+    # Extract valid blocks, moving their embeddings out to save memory
     valid_blocks = []
-
+    block_embeddings = []
     for block in workspace["blocks"]:
-        if block.get('embedding') is not None:
-            embeddings.append(block['embedding'])
-            # Store block without embedding to save memory
-            block_copy = {k: v for k, v in block.items() if k != 'embedding'}
-            valid_blocks.append(block_copy)
+        embedding = block.pop('embedding', None)
+        if embedding is not None:
+            valid_blocks.append(block)
+            block_embeddings.append(embedding)
 
-    if len(embeddings) == 0:
+    if len(valid_blocks) == 0:
         raise ValueError("No valid embeddings found in workspace")
 
-    # Convert to numpy array
-    embeddings_array = np.array(embeddings, dtype='float32')
-    dimension = embeddings_array.shape[1]
-
-    # Create FAISS index with L2 distance
-    index = faiss.IndexFlatL2(dimension)
+    # Stack the remaining blocks' embeddings (blocks may have been filtered since
+    # generate_embeddings); a copy, so normalizing doesn't modify the workspace
+    embeddings_array = np.array(block_embeddings, dtype=np.float32)
 
     # Normalize embeddings for cosine similarity
     faiss.normalize_L2(embeddings_array)
 
-    # Add vectors to index
-    index.add(embeddings_array)
+    # Create FAISS index with inner product (cosine similarity on normalized vectors)
+    index = create_faiss_index(embeddings_array, index_type=index_type)
 
     return index, valid_blocks
 
 
 def process_pdf(
-    pdf_path: Path,
+    pdf_path: Optional[Path] = None,
     doc_id: Optional[str] = None,
-    model_name: str = "all-MiniLM-L6-v2"
+    model_name: str = "all-MiniLM-L6-v2",
+    stream: Optional[bytes] = None,
+    progress_cb: Optional[Callable[[int, int], None]] = None,
+    index_type: str = "auto",
+    workers: int = 1
 ) -> tuple[faiss.Index, List[Dict], Dict]:
     """
     Complete PDF processing pipeline.
@@ -282,21 +640,22 @@ def process_pdf(
         pdf_path: Path to PDF file
         doc_id: Document identifier (defaults to filename)
         model_name: Sentence-transformers model name
+        stream: In-memory PDF bytes (used instead of pdf_path when given)
+        progress_cb: Called as progress_cb(pages_done, total_pages) while parsing
+        index_type: FAISS index kind ('auto', 'flat', 'sq8', 'hnsw' or 'ivfpq')
+        workers: Worker processes for page extraction, see iter_page_blocks
 
     Returns:
         Tuple of (FAISS index, valid blocks, workspace metadata)
     """
     if doc_id is None:
-        doc_id = pdf_path.stem
-
-    # Parse PDF
-    workspace = parse_pdf(pdf_path, doc_id=doc_id)
+        doc_id = pdf_path.stem if pdf_path is not None else "uploaded_pdf"
 
-    # Generate embeddings
-    workspace = generate_embeddings(workspace, model_name=model_name)
+    # Parse PDF and generate embeddings, overlapping the two
+    workspace = _parse_and_embed(pdf_path, doc_id, model_name, stream, progress_cb, workers)
 
     # Build FAISS index
-    index, valid_blocks = build_faiss_index(workspace)
+    index, valid_blocks = build_faiss_index(workspace, index_type=index_type)
 
     # Metadata
     metadata = {
@@ -30,8 +30,6 @@ class WorkspaceAgent(dspy.Module):
         # 2. Fetch candidate units
         candidates = []
         candidates += self.retriever.search_text(search_terms)
-        # candidates += self.retriever.search_tables(search_terms)
-        # candidates += self.retriever.search_images(search_terms)
 
         # Prepare candidate strings for the LLM
         candidate_strs = [
@@ -52,7 +50,7 @@ class WorkspaceAgent(dspy.Module):
 # These paths assume the script is run from the project root
 def create_agent(
     faiss_index_path: str = "experiments/chess_pdf.faiss",
-    workspace_json_path: str = "experiments/workspace_with_embeddings.json",
+    workspace_json_path: str = "experiments/chess_pdf_workspace.json",
     retriever=None,
 ):
     """
@@ -1,11 +1,82 @@
 """FAISS-based retriever for RAG with sentence-transformers embeddings."""
 
 import json
+import threading
+import warnings
 import numpy as np
 import faiss
-from sentence_transformers import SentenceTransformer
+from collections import OrderedDict
+from functools import lru_cache
 from typing import List, Dict, Optional
 from pathlib import Path
+from hack.encoder import get_encoder
+
+try:
+    import orjson
+except ImportError:  # optional; stdlib json parses large workspaces ~4x slower
+    orjson = None
+
+# Repeated queries (e.g. the same training questions across optimizer trials)
+# skip the transformer forward pass; each entry is one float32 vector
+QUERY_CACHE_SIZE = 2048
+
+# Map index data from the file instead of copying it into process memory, so the page
+# cache is shared between processes. IO_FLAG_MMAP covers IVF inverted lists and
+# IO_FLAG_MMAP_IFC (faiss >= 1.8) flat code storage
+MMAP_READ_FLAGS = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_READ_ONLY
+
+
+def _load_json(path: Path):
+    """Parse a JSON file, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(path.read_bytes())
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def _check_faiss_simd() -> bool:
+    """
+    Warn (once) when FAISS lacks AVX2 kernels on a CPU that supports them.
+
+    Without them normalize_L2 and flat search fall back to scalar loops.
+
+    Returns:
+        True if FAISS can use AVX2 or the CPU has no AVX2
+    """
+    if "AVX2" in faiss.supported_instruction_sets() and "AVX2" not in faiss.get_compile_options().split():
+        warnings.warn(
+            "FAISS build has no AVX2 kernels on this AVX2 CPU; install a recent faiss-cpu wheel",
+            RuntimeWarning,
+            stacklevel=2,
+        )
+        return False
+    return True
+
+
+def _object_column(values: List) -> np.ndarray:
+    """1-D object array of values (lists such as bboxes stay elements, not rows)."""
+    return np.fromiter(values, dtype=object, count=len(values))
+
+
+def _result_columns(blocks: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Build the search result fields for all blocks as one array per field.
+
+    Args:
+        blocks: Blocks in FAISS index order
+
+    Returns:
+        Column per result field, in result dict key order
+    """
+    return {
+        'unit_id': _object_column([f"block_{b['page_num']}_{b['block_idx']}" for b in blocks]),
+        'content': _object_column([b['text'] for b in blocks]),
+        'page': np.array([b['page_num'] for b in blocks], dtype=np.int32),
+        'section_path': _object_column([b.get('section_path', '') for b in blocks]),
+        'bbox': _object_column([b.get('bbox', []) for b in blocks]),
+        'type': _object_column([b.get('type', 'unknown') for b in blocks]),
+    }
 
 
 class FaissRetriever:
@@ -18,7 +89,8 @@ class FaissRetriever:
         faiss_index: Optional[faiss.Index] = None,
         blocks: Optional[List[Dict]] = None,
         model_name: str = "all-MiniLM-L6-v2",
-        k: int = 10
+        k: int = 10,
+        mmap: bool = False
     ):
         """
         Initialize FAISS retriever.
@@ -29,13 +101,19 @@ class FaissRetriever:
 
         Args:
             faiss_index_path: Path to the FAISS index file (file-based mode)
-            workspace_json_path: Path to workspace JSON with blocks (file-based mode)
+            workspace_json_path: Path to workspace JSON with blocks (file-based mode), either
+                the metadata JSON from save_workspace (its .npy is not needed) or a legacy
+                JSON with inlined embeddings
             faiss_index: FAISS index object (in-memory mode)
             blocks: List of blocks without embeddings (in-memory mode)
             model_name: Name of sentence-transformers model (must match embedding model)
             k: Default number of results to return
+            mmap: Memory-map the index file read-only instead of loading it (file-based mode)
         """
         self.k = k
+        # Normalized query embeddings by query text, in least-recently-used order
+        self._query_cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._query_cache_lock = threading.Lock()
 
         # Determine mode and load data
         if faiss_index is not None and blocks is not None:
@@ -47,42 +125,116 @@ class FaissRetriever:
             index_path = Path(faiss_index_path)
             if not index_path.exists():
                 raise FileNotFoundError(f"FAISS index not found at {faiss_index_path}")
-            self.index = faiss.read_index(str(index_path))
+            self.index = faiss.read_index(str(index_path), MMAP_READ_FLAGS if mmap else 0)
 
             # Load workspace data
             workspace_path = Path(workspace_json_path)
             if not workspace_path.exists():
                 raise FileNotFoundError(f"Workspace JSON not found at {workspace_json_path}")
 
-            with open(workspace_path, 'r') as f:
-                self.workspace_data = json.load(f)
+            self.workspace_data = _load_json(workspace_path)
 
             # Extract blocks with valid embeddings
-            self.blocks = []
-            for block in self.workspace_data['blocks']:
-                if block.get('embedding') is not None:
-                    # Store block without embedding to save memory
-                    block_copy = {k: v for k, v in block.items() if k != 'embedding'}
-                    self.blocks.append(block_copy)
+            if 'embedding_rows' in self.workspace_data:
+                # Written by save_workspace: embeddings live in a separate .npy file
+                # and are not needed here, the FAISS index already holds the vectors
+                self.blocks = [
+                    block
+                    for block, row in zip(self.workspace_data['blocks'], self.workspace_data['embedding_rows'])
+                    if row is not None
+                ]
+            else:
+                # Legacy workspace with embeddings inlined as JSON floats
+                self.blocks = []
+                for block in self.workspace_data['blocks']:
+                    if block.get('embedding') is not None:
+                        # Store block without embedding to save memory
+                        block_copy = {k: v for k, v in block.items() if k != 'embedding'}
+                        self.blocks.append(block_copy)
         else:
             raise ValueError(
                 "Must provide either (faiss_index + blocks) for in-memory mode "
                 "or (faiss_index_path + workspace_json_path) for file-based mode"
             )
 
-        # Load sentence transformer model
-        self.model = SentenceTransformer(model_name)
+        # Result fields as columns indexed by FAISS id, so hits are gathered in one pass
+        self._columns = _result_columns(self.blocks)
+
+        # Index ids of each block type, for filtered searches
+        ids_by_type: Dict[str, List[int]] = {}
+        for block_id, block in enumerate(self.blocks):
+            ids_by_type.setdefault(block.get('type'), []).append(block_id)
+        self._ids_by_type = {
+            block_type: np.array(ids, dtype=np.int64) for block_type, ids in ids_by_type.items()
+        }
+
+        # Load sentence transformer model (shared across retrievers and the PDF pipeline)
+        self.model = get_encoder(model_name)
+
+        _check_faiss_simd()
 
         print(f"Loaded FAISS index with {self.index.ntotal} vectors")
         print(f"Loaded {len(self.blocks)} blocks from workspace")
 
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Encode a batch of query texts into a (Q, D) matrix, reusing cached embeddings."""
+        # Agents may share a retriever across threads (e.g. parallel evaluation); the lock
+        # covers cache lookups and inserts only, so threads encode concurrently
+        with self._query_cache_lock:
+            found = {}
+            for query in queries:
+                if query in self._query_cache:
+                    self._query_cache.move_to_end(query)
+                    found[query] = self._query_cache[query]
+        misses = [q for q in dict.fromkeys(queries) if q not in found]
+
+        if misses:
+            # One forward pass for all queries not seen before
+            embeddings = self.model.encode(misses, convert_to_numpy=True)
+            # FAISS needs C-contiguous float32; only copies when the encoder output isn't
+            embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+            # Normalize for cosine similarity (matching index creation)
+            faiss.normalize_L2(embeddings)
+            found.update(zip(misses, embeddings))
+
+            with self._query_cache_lock:
+                for query in misses:
+                    self._query_cache[query] = found[query]
+                # Evict least recently used queries
+                while len(self._query_cache) > QUERY_CACHE_SIZE:
+                    self._query_cache.popitem(last=False)
+
+        return np.stack([found[query] for query in queries])
+
     def _encode_query(self, query: str) -> np.ndarray:
         """Encode query text into embedding vector."""
-        embedding = self.model.encode([query], convert_to_numpy=True)
-        embedding = embedding.astype('float32')
-        # Normalize for cosine similarity (matching index creation)
-        faiss.normalize_L2(embedding)
-        return embedding
+        return self._encode_queries([query])
+
+    def _collect_results(
+        self,
+        distances: np.ndarray,
+        indices: np.ndarray,
+        k: int
+    ) -> List[Dict]:
+        """Turn one row of FAISS search output into formatted result blocks."""
+        # FAISS pads with -1 when fewer than search_k vectors are found
+        hits = (indices >= 0) & (indices < len(self.blocks))
+        ids = indices[hits][:k]
+        distances = distances[hits][:k]
+
+        if self.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+            # Inner product of normalized vectors is already cosine similarity
+            # (clamped: float rounding can put exact matches slightly above 1)
+            similarities = np.clip(distances, 0.0, 1.0)
+        else:
+            # Legacy L2 indices: normalized squared L2 distance is in [0, 2],
+            # convert to similarity [0, 1]; lower distance = higher similarity
+            similarities = np.maximum(0.0, 1.0 - distances / 2.0)
+
+        # Format as expected by WorkspaceAgent
+        fields = {name: column[ids].tolist() for name, column in self._columns.items()}
+        fields['similarity'] = similarities.tolist()
+        return [dict(zip(fields, values)) for values in zip(*fields.values())]
 
     def _search(self, query: str, k: Optional[int] = None, block_type: Optional[str] = None) -> List[Dict]:
         """
@@ -96,52 +248,73 @@ class FaissRetriever:
         Returns:
             List of blocks with metadata
         """
-        if k is None:
-            k = self.k
+        return self.search_multi([query], k=k, block_types=[block_type])[0]
 
-        # Encode query
-        query_embedding = self._encode_query(query)
-
-        # Search FAISS index
-        # Request more results if we need to filter by type
-        search_k = k * 3 if block_type else k
-        distances, indices = self.index.search(query_embedding, search_k)
-
-        # Retrieve matching blocks
-        results = []
-        for idx, distance in zip(indices[0], distances[0]):
-            if idx >= len(self.blocks):
-                continue
-
-            block = self.blocks[idx].copy()
-
-            # Filter by type if specified
-            if block_type and block.get('type') != block_type:
-                continue
+    def search_multi(
+        self,
+        queries: List[str],
+        k: Optional[int] = None,
+        block_types: Optional[List[Optional[str]]] = None
+    ) -> List[List[Dict]]:
+        """
+        Search several queries with one encoder batch and one FAISS search call.
 
-            # Add similarity score
-            # For normalized L2 distance: distance is in [0, 2], convert to similarity [0, 1]
-            # Lower distance = higher similarity
-            similarity = max(0.0, 1.0 - (distance / 2.0))
-            block['similarity'] = float(similarity)
+        Args:
+            queries: Search query texts
+            k: Number of results to return per query (uses default if None)
+            block_types: Optional per-query block type filter (None entries don't filter)
 
-            # Format as expected by WorkspaceAgent
-            result = {
-                'unit_id': f"block_{block['page_num']}_{block['block_idx']}",
-                'content': block['text'],
-                'page': block['page_num'],
-                'section_path': block.get('section_path', ''),
-                'bbox': block.get('bbox', []),
-                'type': block.get('type', 'unknown'),
-                'similarity': block['similarity']
-            }
+        Returns:
+            One list of blocks with metadata per query, in query order
+        """
+        if k is None:
+            k = self.k
+        if block_types is None:
+            block_types = [None] * len(queries)
+        if len(block_types) != len(queries):
+            raise ValueError("block_types must have one entry per query")
+        if not queries:
+            return []
+
+        results: List[List[Dict]] = [[] for _ in queries]
+
+        # Group queries by filter; types with no blocks in the document stay empty
+        groups: Dict[Optional[str], List[int]] = {}
+        for i, block_type in enumerate(block_types):
+            if block_type is None or block_type in self._ids_by_type:
+                groups.setdefault(block_type, []).append(i)
+        if not groups:
+            return results
+
+        # Encode all queries that need searching together
+        searched = [i for rows in groups.values() for i in rows]
+        embeddings = dict(zip(searched, self._encode_queries([queries[i] for i in searched])))
+
+        # One FAISS search per filter, restricted to that type's ids so exactly k are needed
+        for block_type, rows in groups.items():
+            query_embeddings = np.stack([embeddings[i] for i in rows])
+            if block_type is None:
+                distances, indices = self.index.search(query_embeddings, k)
+            else:
+                params = self._type_search_params(block_type)
+                distances, indices = self.index.search(query_embeddings, k, params=params)
+
+            for row, i in enumerate(rows):
+                results[i] = self._collect_results(distances[row], indices[row], k)
 
-            results.append(result)
+        return results
 
-            if len(results) >= k:
-                break
+    def _type_search_params(self, block_type: str) -> faiss.SearchParameters:
+        """Search parameters that restrict results to blocks of one type."""
+        selector = faiss.IDSelectorBatch(self._ids_by_type[block_type])
 
-        return results
+        # Index-specific parameter classes, keeping the index's own search settings
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None:
+            return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+        if isinstance(self.index, faiss.IndexHNSW):
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=self.index.hnsw.efSearch)
+        return faiss.SearchParameters(sel=selector)
 
     def search_text(self, query: str, k: Optional[int] = None) -> List[Dict]:
         """
@@ -202,17 +375,28 @@ class FaissRetriever:
 class MockRetriever:
     """Mock retriever for testing purposes."""
 
+    def __init__(self, data: Optional[List[Dict]] = None):
+        """
+        Initialize mock retriever.
+
+        Args:
+            data: Text results returned for every query (defaults to one mock block)
+        """
+        if data is None:
+            data = [
+                {
+                    'unit_id': 'mock_1',
+                    'content': 'Mock text result',
+                    'page': 1,
+                    'section_path': '1.0',
+                    'bbox': [0, 0, 100, 100]
+                }
+            ]
+        self.data = data
+
     def search_text(self, query: str) -> List[Dict]:
         """Return mock text results."""
-        return [
-            {
-                'unit_id': 'mock_1',
-                'content': 'Mock text result',
-                'page': 1,
-                'section_path': '1.0',
-                'bbox': [0, 0, 100, 100]
-            }
-        ]
+        return list(self.data)
 
     def search_tables(self, query: str) -> List[Dict]:
         """Return mock table results."""
@@ -221,3 +405,17 @@ class MockRetriever:
     def search_images(self, query: str) -> List[Dict]:
         """Return mock image results."""
         return []
+
+    def search_multi(
+        self,
+        queries: List[str],
+        k: Optional[int] = None,
+        block_types: Optional[List[Optional[str]]] = None
+    ) -> List[List[Dict]]:
+        """Return mock text results for unfiltered queries and none for type-filtered ones."""
+        if block_types is None:
+            block_types = [None] * len(queries)
+        return [
+            self.search_text(query) if block_type is None else []
+            for query, block_type in zip(queries, block_types)
+        ]
@@ -0,0 +1,150 @@
+"""Shared fixtures for hack tests."""
+
+import hashlib
+import os
+import shutil
+from pathlib import Path
+import numpy as np
+import pytest
+from tests.hack.helpers import FAKE_DIM, FakeEncoder, warm_query_cache
+
+# faiss, torch and hack.retriever are imported where used, so test modules that
+# importorskip them are skipped cleanly when they are missing
+
+# Queries searched by the retriever tests, encoded together in one batch
+RETRIEVER_TEST_QUERIES = [
+    "chess opening moves",
+    "endgame strategy",
+    "pawn structure",
+]
+
+RETRIEVER_MODEL = "all-MiniLM-L6-v2"
+
+# Files built by the tests, shared between sessions and xdist workers, outside the source tree
+TEST_CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "hack-tests"
+# Normalized query embeddings per model, as <sha256 of query>.npy; missing files are
+# written on the first run with the model available
+EMBED_CACHE_DIR = TEST_CACHE_DIR / "query_embeddings"
+
+# One block per line; the retriever fixture indexes this instead of the chess PDF
+MINI_CORPUS_PATH = Path(__file__).parent / "_fixtures" / "mini_corpus.txt"
+# Built mini indexes, one directory per (corpus, model) hash
+FIXTURE_CACHE_DIR = TEST_CACHE_DIR / "indexes"
+
+FAISS_TEST_THREADS = 4
+
+FAKE_BLOCK_TYPES = ["body", "table", "body", "h2"] * 4
+
+
+def pytest_configure(config):
+    """Limit native thread pools for the test run."""
+    try:
+        import faiss
+    except ImportError:
+        # Modules that need faiss skip themselves at collection
+        return
+
+    if os.environ.get("PYTEST_XDIST_WORKER"):
+        import torch
+
+        # Each worker is its own process; one thread each keeps N workers from
+        # oversubscribing N cores
+        faiss.omp_set_num_threads(1)
+        torch.set_num_threads(1)
+    else:
+        # Test indexes are tiny, more OpenMP threads only add startup and contention
+        faiss.omp_set_num_threads(min(os.cpu_count() or 1, FAISS_TEST_THREADS))
+
+
+def _build_mini_index(out_dir: Path) -> None:
+    """Embed the mini corpus and write mini.faiss plus its workspace JSON/.npy to out_dir."""
+    import faiss
+    from hack.pdf_processor import build_faiss_index, generate_embeddings, save_workspace
+
+    lines = MINI_CORPUS_PATH.read_text().splitlines()
+    workspace = {
+        "doc_id": "mini",
+        "num_pages": (len(lines) + 4) // 5,
+        "blocks": [
+            {
+                "page_num": i // 5,
+                "block_idx": i,
+                "bbox": [0.0, 10.0 * i, 100.0, 10.0 * i + 8.0],
+                "text": text,
+                "type": "body",
+                "section_path": "Mini corpus",
+            }
+            for i, text in enumerate(lines)
+        ],
+    }
+    generate_embeddings(workspace, model_name=RETRIEVER_MODEL)
+    save_workspace(workspace, out_dir / "mini_workspace.json")
+    index, _ = build_faiss_index(workspace)
+    faiss.write_index(index, str(out_dir / "mini.faiss"))
+
+
+@pytest.fixture(scope="session")
+def mini_index_dir(tmp_path_factory) -> Path:
+    """Directory with the mini corpus index, built on first use and cached by content hash."""
+    digest = hashlib.sha256(MINI_CORPUS_PATH.read_bytes() + RETRIEVER_MODEL.encode()).hexdigest()[:16]
+    cache_dir = FIXTURE_CACHE_DIR / digest
+    if not (cache_dir / "mini.faiss").exists():
+        build_dir = tmp_path_factory.mktemp("fixtures")
+        _build_mini_index(build_dir)
+        # Stage next to the cache and rename, so concurrent workers never see partial files
+        FIXTURE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        staging = FIXTURE_CACHE_DIR / f"{digest}.{os.getpid()}"
+        shutil.copytree(build_dir, staging)
+        try:
+            os.replace(staging, cache_dir)
+        except OSError:
+            # Another worker finished first
+            shutil.rmtree(staging)
+    return cache_dir
+
+
+@pytest.fixture(scope="session")
+def retriever(mini_index_dir):
+    """FaissRetriever over the mini corpus index, loaded once for the whole session."""
+    from hack.retriever import FaissRetriever
+
+    retriever = FaissRetriever(
+        faiss_index_path=mini_index_dir / "mini.faiss",
+        workspace_json_path=mini_index_dir / "mini_workspace.json",
+        model_name=RETRIEVER_MODEL,
+        k=5,
+        mmap=True
+    )
+    # Searches for the test queries then hit the query cache instead of the model
+    warm_query_cache(retriever, RETRIEVER_TEST_QUERIES, EMBED_CACHE_DIR / RETRIEVER_MODEL)
+    # The first search starts FAISS's OpenMP thread pool; pay that here, not in a test
+    retriever.index.search(np.zeros((1, retriever.index.d), dtype=np.float32), 1)
+    return retriever
+
+
+@pytest.fixture
+def fake_retriever(monkeypatch):
+    """In-memory FaissRetriever over 16 random blocks with a FakeEncoder model."""
+    import faiss
+    import hack.retriever as retriever_module
+
+    model = FakeEncoder()
+    monkeypatch.setattr(retriever_module, "get_encoder", lambda model_name: model)
+
+    vectors = np.random.RandomState(0).randn(len(FAKE_BLOCK_TYPES), FAKE_DIM).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    index = faiss.IndexFlatIP(FAKE_DIM)
+    index.add(vectors)
+
+    blocks = [
+        {
+            "text": f"Block {i} text",
+            "page_num": i // 4,
+            "block_idx": i,
+            "section_path": f"Chapter {i // 8 + 1}",
+            "bbox": [0.0, 10.0 * i, 100.0, 10.0 * i + 8.0],
+            "type": block_type,
+        }
+        for i, block_type in enumerate(FAKE_BLOCK_TYPES)
+    ]
+    return retriever_module.FaissRetriever(faiss_index=index, blocks=blocks, k=5)
@@ -0,0 +1,42 @@
+"""Test doubles and helpers shared by the hack test modules."""
+
+import hashlib
+import zlib
+from pathlib import Path
+import numpy as np
+
+FAKE_DIM = 8
+
+
+class FakeEncoder:
+    """Stand-in for SentenceTransformer: deterministic vectors per text, records calls."""
+
+    def __init__(self, dim: int = FAKE_DIM):
+        self.dim = dim
+        self.encoded = []
+
+    def encode(self, texts, **kwargs):
+        self.encoded.extend(texts)
+        return np.stack([
+            np.random.RandomState(zlib.crc32(text.encode())).randn(self.dim).astype(np.float32)
+            for text in texts
+        ])
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+
+def warm_query_cache(retriever, queries, cache_dir: Path) -> None:
+    """Fill the retriever's query cache from disk, encoding (and saving) only missing queries."""
+    paths = {q: cache_dir / f"{hashlib.sha256(q.encode()).hexdigest()}.npy" for q in queries}
+    missing = [q for q, path in paths.items() if not path.exists()]
+
+    if missing:
+        # One forward pass for all queries not cached on disk yet
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        for query, embedding in zip(missing, retriever._encode_queries(missing)):
+            np.save(paths[query], embedding)
+
+    for query, path in paths.items():
+        if query not in retriever._query_cache:
+            retriever._query_cache[query] = np.load(path)
@@ -0,0 +1,50 @@
+"""Tests for shared encoder loading."""
+
+import pytest
+import hack.encoder as encoder
+
+
+class FakeSentenceTransformer:
+    """Stand-in model that records how it was created."""
+
+    def __init__(self, model_name, device=None):
+        self.model_name = model_name
+        self.device = device
+        self.is_half = False
+
+    def half(self):
+        self.is_half = True
+        return self
+
+    def eval(self):
+        return self
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    """Replace SentenceTransformer and start with an empty cache."""
+    monkeypatch.setattr(encoder, "SentenceTransformer", FakeSentenceTransformer)
+    encoder._load_encoder.cache_clear()
+    yield
+    encoder._load_encoder.cache_clear()
+
+
+class TestGetEncoder:
+    """Tests for get_encoder function."""
+
+    def test_reuses_model_for_same_name(self, fake_models):
+        """Test that repeated loads share one model instance."""
+        first = encoder.get_encoder("model-a", device="cpu")
+        second = encoder.get_encoder("model-a", device="cpu")
+        assert first is second
+
+    def test_separate_models_per_precision(self, fake_models):
+        """Test that fp16 models are cached separately from fp32 ones."""
+        fp32 = encoder.get_encoder("model-a", device="cpu")
+        fp16 = encoder.get_encoder("model-a", device="cpu", fp16=True)
+        assert fp32 is not fp16
+        assert fp16.is_half and not fp32.is_half
+
+    def test_defaults_to_detected_device(self, fake_models):
+        """Test that the device falls back to get_device()."""
+        assert encoder.get_encoder("model-a").device == encoder.get_device()
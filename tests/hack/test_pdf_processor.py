@@ -0,0 +1,328 @@
+"""Tests for PDF processing pipeline."""
+
+import os
+import subprocess
+import sys
+import threading
+import pytest
+from pathlib import Path
+import numpy as np
+import faiss
+import hack.pdf_processor as pdf_processor
+from hack.pdf_processor import (
+    build_faiss_index,
+    classify_blocks,
+    create_faiss_index,
+    generate_embeddings,
+    load_workspace,
+    parse_pdf,
+    process_pdf,
+    save_workspace,
+)
+from tests.hack.helpers import FAKE_DIM, FakeEncoder
+
+PDF_PATH = Path("resources/chess.pdf")
+
+
+@pytest.fixture(scope="module")
+def workspace():
+    """Parse the chess PDF from disk."""
+    return parse_pdf(PDF_PATH, doc_id="chess")
+
+
+class TestParsePdf:
+    """Tests for parse_pdf function."""
+
+    def test_parse_pdf_returns_blocks(self, workspace):
+        """Test that parsing produces a workspace with blocks."""
+        assert workspace["doc_id"] == "chess"
+        assert workspace["num_pages"] > 0
+        assert len(workspace["blocks"]) > 0
+
+    def test_parse_pdf_from_stream_matches_path(self, workspace):
+        """Test that parsing in-memory bytes matches parsing the file."""
+        streamed = parse_pdf(doc_id="chess", stream=PDF_PATH.read_bytes())
+        assert streamed == workspace
+
+    def test_parse_pdf_requires_source(self):
+        """Test that a path or stream must be provided."""
+        with pytest.raises(ValueError):
+            parse_pdf()
+
+    def test_parse_pdf_reports_page_progress(self, workspace):
+        """Test that the progress callback is called once per page."""
+        calls = []
+        parse_pdf(PDF_PATH, progress_cb=lambda done, total: calls.append((done, total)))
+        num_pages = workspace["num_pages"]
+        assert calls == [(i, num_pages) for i in range(1, num_pages + 1)]
+
+    def test_parallel_extraction_matches_sequential(self, workspace):
+        """Test that worker processes produce the same workspace, in page order."""
+        calls = []
+        parallel = parse_pdf(
+            doc_id="chess",
+            stream=PDF_PATH.read_bytes(),
+            progress_cb=lambda done, total: calls.append(done),
+            workers=2,
+        )
+        assert parallel == workspace
+        assert calls[-1] == workspace["num_pages"]
+
+    def test_page_workers_do_not_import_model_stack(self):
+        """Test that the module page workers import leaves torch and faiss unloaded."""
+        code = "import sys, hack.pdf_pages; print('torch' in sys.modules or 'faiss' in sys.modules)"
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env)
+        assert out.stdout.strip() == "False"
+
+
+class TestClassifyBlocks:
+    """Tests for vectorized classify_blocks function."""
+
+    @pytest.fixture
+    def blocks(self):
+        """Blocks whose font sizes put p75/p90/p95 at 9.25/12.0/12.2."""
+        sized_texts = [
+            (16.0, "Chapter One"),
+            (12.0, "Section"),
+            (12.0, "Another section"),
+            (10.0, "Subsection"),
+            (10.0, "x" * 150),
+            (9.0, "ab"),
+            (9.0, "The Project Gutenberg License"),
+        ] + [(9.0, "Plain text")] * 13
+        return [{"font_size": size, "text": text} for size, text in sized_texts]
+
+    def test_classifies_by_font_size_percentiles(self, blocks):
+        """Test heading levels against the document's own font size percentiles."""
+        types = classify_blocks(blocks)
+        assert types[:5] == ["h1", "h2", "h2", "h3", "body"]
+        assert types[7:] == ["body"] * 13
+
+    def test_skips_short_and_boilerplate_blocks(self, blocks):
+        """Test that tiny blocks and license boilerplate are skipped."""
+        assert classify_blocks(blocks)[5:7] == ["skip", "skip"]
+
+    def test_empty_input(self):
+        """Test that no blocks yields no types."""
+        assert classify_blocks([]) == []
+
+    def test_skip_patterns_do_not_span_blocks(self):
+        """Test that boilerplate is matched per block, case-insensitively."""
+        texts = ["An eBook edition", "İstanbul copy", "right after", "Plain text"]
+        blocks = [{"font_size": 10.0, "text": t} for t in texts]
+        skipped = [block_type == "skip" for block_type in classify_blocks(blocks)]
+        assert skipped == [True, False, False, False]
+
+
+class TestBuildFaissIndex:
+    """Tests for build_faiss_index function."""
+
+    @pytest.fixture
+    def embedded_workspace(self):
+        """Workspace shaped like generate_embeddings output, with random vectors."""
+        matrix = np.random.RandomState(0).randn(3, 8).astype(np.float32)
+        index_map = [0, None, 1, 2]
+        blocks = [
+            {"text": f"block {i}", "embedding": None if row is None else matrix[row]}
+            for i, row in enumerate(index_map)
+        ]
+        return {"blocks": blocks, "_emb_matrix": matrix, "_emb_index_map": index_map}
+
+    def test_indexes_only_embedded_blocks(self, embedded_workspace):
+        """Test that blocks without embeddings are left out of the index."""
+        index, valid_blocks = build_faiss_index(embedded_workspace)
+        assert index.ntotal == 3
+        assert [b["text"] for b in valid_blocks] == ["block 0", "block 2", "block 3"]
+        assert all("embedding" not in b for b in valid_blocks)
+
+    def test_index_follows_filtered_blocks(self, embedded_workspace):
+        """Test that ids map to the right blocks after blocks are dropped from the workspace."""
+        matrix = embedded_workspace["_emb_matrix"].copy()
+        del embedded_workspace["blocks"][0]
+        index, valid_blocks = build_faiss_index(embedded_workspace)
+        assert [b["text"] for b in valid_blocks] == ["block 2", "block 3"]
+
+        expected = matrix[1:] / np.linalg.norm(matrix[1:], axis=1, keepdims=True)
+        np.testing.assert_allclose(index.reconstruct_n(0, index.ntotal), expected, rtol=1e-6)
+
+    def test_does_not_modify_workspace_embeddings(self, embedded_workspace):
+        """Test that normalization for the index works on a copy."""
+        original = embedded_workspace["_emb_matrix"].copy()
+        build_faiss_index(embedded_workspace)
+        np.testing.assert_array_equal(embedded_workspace["_emb_matrix"], original)
+
+
+class TestSaveWorkspace:
+    """Tests for save_workspace and load_workspace functions."""
+
+    def test_round_trip(self, tmp_path):
+        """Test that blocks and embeddings survive a save/load round trip."""
+        matrix = np.random.RandomState(0).randn(2, 8).astype(np.float32)
+        workspace = {
+            "doc_id": "doc",
+            "num_pages": 1,
+            "blocks": [
+                {"text": "first", "embedding": matrix[0]},
+                {"text": "", "embedding": None},
+                {"text": "second", "embedding": matrix[1]},
+            ],
+            "_emb_matrix": matrix,
+            "_emb_index_map": [0, None, 1],
+        }
+        save_workspace(workspace, tmp_path / "doc.json")
+        assert (tmp_path / "doc.npy").exists()
+
+        loaded = load_workspace(tmp_path / "doc.json")
+        assert loaded["doc_id"] == "doc"
+        assert loaded["_emb_index_map"] == [0, None, 1]
+        np.testing.assert_array_equal(loaded["_emb_matrix"], matrix)
+        assert loaded["blocks"][1]["embedding"] is None
+        np.testing.assert_array_equal(loaded["blocks"][2]["embedding"], matrix[1])
+
+    def test_metadata_only_workspace_is_rejected(self, tmp_path):
+        """Test that loading a workspace JSON without its .npy names the missing file."""
+        (tmp_path / "doc.json").write_text('{"blocks": [], "embedding_rows": []}')
+        with pytest.raises(FileNotFoundError, match="doc.npy"):
+            load_workspace(tmp_path / "doc.json")
+
+
+class TestCreateFaissIndex:
+    """Tests for create_faiss_index function."""
+
+    @pytest.fixture
+    def embeddings(self):
+        """Random L2-normalized vectors."""
+        vectors = np.random.RandomState(0).randn(300, 64).astype(np.float32)
+        faiss.normalize_L2(vectors)
+        return vectors
+
+    def test_auto_uses_flat_for_small_inputs(self, embeddings):
+        """Test that small collections get an exact inner-product index."""
+        index = create_faiss_index(embeddings)
+        assert isinstance(index, faiss.IndexFlatIP)
+        assert index.ntotal == len(embeddings)
+
+    def test_hnsw_finds_exact_match(self, embeddings):
+        """Test that the HNSW index returns a stored vector as its own top hit."""
+        index = create_faiss_index(embeddings, index_type="hnsw")
+        assert index.metric_type == faiss.METRIC_INNER_PRODUCT
+        _, indices = index.search(embeddings[:5], 1)
+        assert indices[:, 0].tolist() == [0, 1, 2, 3, 4]
+
+    def test_sq8_preserves_top_hits(self, embeddings):
+        """Test that the int8-quantized index ranks a stored vector first."""
+        index = create_faiss_index(embeddings, index_type="sq8")
+        assert index.sa_code_size() == embeddings.shape[1]
+        _, indices = index.search(embeddings[:5], 1)
+        assert indices[:, 0].tolist() == [0, 1, 2, 3, 4]
+
+    def test_ivfpq_falls_back_to_flat_for_small_inputs(self, embeddings):
+        """Test that too few vectors to train IVF-PQ get an exact index instead."""
+        index = create_faiss_index(embeddings, index_type="ivfpq")
+        assert isinstance(index, faiss.IndexFlatIP)
+
+    def test_ivfpq_scales_clusters_with_input_size(self, embeddings, monkeypatch):
+        """Test that IVF clusters are capped so each has enough training points."""
+        monkeypatch.setattr(pdf_processor, "IVFPQ_MIN_VECTORS", 100)
+        index = create_faiss_index(embeddings, index_type="ivfpq")
+        nlist = faiss.extract_index_ivf(index).nlist
+        assert nlist == len(embeddings) // pdf_processor.IVFPQ_POINTS_PER_CLUSTER
+        assert index.ntotal == len(embeddings)
+
+    def test_ivfpq_rejects_indivisible_dimension(self, embeddings):
+        """Test that a dimension the PQ sub-vectors can't split evenly raises."""
+        with pytest.raises(ValueError, match="divisible"):
+            create_faiss_index(embeddings[:, :40].copy(), index_type="ivfpq")
+
+    def test_rejects_unknown_index_type(self, embeddings):
+        """Test that an unknown index type raises."""
+        with pytest.raises(ValueError):
+            create_faiss_index(embeddings, index_type="lsh")
+
+
+class RecordingEncoder(FakeEncoder):
+    """FakeEncoder that logs each encode call into a shared event list."""
+
+    def __init__(self, events):
+        super().__init__()
+        self.events = events
+
+    def encode(self, texts, **kwargs):
+        self.events.append("encode")
+        return super().encode(texts, **kwargs)
+
+
+class FailingEncoder(FakeEncoder):
+    """FakeEncoder whose encode always fails."""
+
+    def encode(self, texts, **kwargs):
+        raise RuntimeError("encoder failed")
+
+
+@pytest.fixture
+def fake_encoder(monkeypatch):
+    """Use a fake model and small encode chunks so several chunks are encoded."""
+    monkeypatch.setattr(pdf_processor, "get_encoder", lambda *args, **kwargs: FakeEncoder())
+    monkeypatch.setattr(pdf_processor, "ENCODE_CHUNK_SIZE", 50)
+
+
+class TestGenerateEmbeddings:
+    """Tests for generate_embeddings function."""
+
+    def test_embeddings_are_views_into_matrix(self, fake_encoder):
+        """Test that block embeddings are float32 rows of one matrix, not Python lists."""
+        workspace = generate_embeddings({"blocks": [{"text": "first block"}, {"text": ""}, {"text": "second"}]})
+        matrix = workspace["_emb_matrix"]
+        assert matrix.dtype == np.float32 and matrix.shape == (2, FAKE_DIM)
+
+        first, empty, second = (block["embedding"] for block in workspace["blocks"])
+        assert empty is None
+        assert isinstance(first, np.ndarray) and np.shares_memory(first, matrix)
+        np.testing.assert_array_equal(second, matrix[1])
+
+
+class TestProcessPdf:
+    """Tests for the streaming process_pdf pipeline."""
+
+    def test_matches_sequential_pipeline(self, fake_encoder):
+        """Test that overlapped parsing and encoding gives the same index and blocks."""
+        index, blocks, metadata = process_pdf(PDF_PATH)
+
+        workspace = generate_embeddings(parse_pdf(PDF_PATH, doc_id="chess"))
+        expected_index, expected_blocks = build_faiss_index(workspace)
+
+        assert metadata["doc_id"] == "chess"
+        assert blocks == expected_blocks
+        np.testing.assert_array_equal(
+            index.reconstruct_n(0, index.ntotal),
+            expected_index.reconstruct_n(0, expected_index.ntotal),
+        )
+
+    def test_parallel_workers_match_sequential(self, fake_encoder):
+        """Test that page worker processes give the same blocks as sequential parsing."""
+        _, expected_blocks, _ = process_pdf(PDF_PATH)
+        _, blocks, _ = process_pdf(stream=PDF_PATH.read_bytes(), doc_id="chess", workers=2)
+        assert blocks == expected_blocks
+
+    def test_encodes_while_parsing(self, fake_encoder, monkeypatch):
+        """Test that the first chunk is encoded before the last page is parsed."""
+        events = []
+        monkeypatch.setattr(pdf_processor, "get_encoder", lambda *args, **kwargs: RecordingEncoder(events))
+        process_pdf(PDF_PATH, progress_cb=lambda done, total: events.append(done))
+
+        last_page = max(e for e in events if e != "encode")
+        assert events.index("encode") < events.index(last_page)
+
+    def test_encode_errors_stop_the_parser(self, fake_encoder, monkeypatch):
+        """Test that an encoder failure is raised and the parser thread exits."""
+        monkeypatch.setattr(pdf_processor, "get_encoder", lambda *args, **kwargs: FailingEncoder())
+        threads = threading.active_count()
+        with pytest.raises(RuntimeError):
+            process_pdf(PDF_PATH)
+        assert threading.active_count() == threads
+
+    def test_propagates_parse_errors(self, fake_encoder):
+        """Test that a failure in the parser thread is raised to the caller."""
+        with pytest.raises(ValueError):
+            process_pdf(doc_id="missing")
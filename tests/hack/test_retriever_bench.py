@@ -0,0 +1,42 @@
+"""Micro-benchmarks for FAISS retriever search (requires pytest-benchmark)."""
+
+import pytest
+
+# Skip the module at collection time when the plugin or search stack isn't installed
+pytest.importorskip("pytest_benchmark")
+pytest.importorskip("faiss")
+pytest.importorskip("sentence_transformers")
+
+import hack.retriever as retriever_module  # noqa: E402
+from hack.retriever import FaissRetriever  # noqa: E402
+from tests.hack.helpers import FakeEncoder  # noqa: E402
+
+BENCH_QUERY = "chess opening moves"
+
+
+@pytest.fixture(scope="module")
+def chess_retriever():
+    """Retriever over the committed chess index with a fake encoder, query already cached."""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(retriever_module, "get_encoder", lambda model_name: FakeEncoder(dim=384))
+        retriever = FaissRetriever(
+            faiss_index_path="experiments/chess_pdf.faiss",
+            workspace_json_path="experiments/chess_pdf_workspace.json",
+        )
+    # Only FAISS search and result formatting are timed, not the encoder
+    retriever.search_text(BENCH_QUERY)
+    return retriever
+
+
+class TestSearchBenchmarks:
+    """Latency benchmarks for retriever searches."""
+
+    def test_bench_search_text(self, benchmark, chess_retriever):
+        """Benchmark an unfiltered top-10 search."""
+        results = benchmark(chess_retriever.search_text, BENCH_QUERY, 10)
+        assert len(results) == 10
+
+    def test_bench_type_filtered_search(self, benchmark, chess_retriever):
+        """Benchmark a search restricted to one block type through an ID selector."""
+        results = benchmark(chess_retriever.search_multi, [BENCH_QUERY], 10, ["body"])
+        assert all(r["type"] == "body" for r in results[0])
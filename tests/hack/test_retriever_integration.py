@@ -0,0 +1,39 @@
+"""Integration tests for FAISS retriever against the real model (mini corpus index)."""
+
+import pytest
+
+# Skip the module at collection time when the search stack isn't installed
+pytest.importorskip("faiss")
+pytest.importorskip("sentence_transformers")
+
+# Loads the sentence-transformers model; run with `pytest -m slow`
+pytestmark = pytest.mark.slow
+
+
+class TestFaissRetriever:
+    """Tests for FaissRetriever class."""
+
+    def test_retriever_initialization(self, retriever):
+        """Test that retriever initializes correctly."""
+        assert retriever is not None
+        assert retriever.index is not None
+        assert len(retriever.blocks) > 0
+        assert retriever.model is not None
+
+    @pytest.mark.parametrize("method,query", [
+        ("search_text", "chess opening moves"),
+        ("search_all", "pawn structure"),
+    ])
+    def test_search_returns_results(self, retriever, method, query):
+        """Test that unfiltered searches return results from the mini corpus index."""
+        results = getattr(retriever, method)(query, k=5)
+        assert isinstance(results, list)
+        assert 0 < len(results) <= 5
+
+    def test_search_multi_matches_single_searches(self, retriever):
+        """Test that batched search returns the same results as one-by-one search."""
+        queries = ["chess opening moves", "endgame strategy"]
+        results = retriever.search_multi(queries, k=3)
+        assert len(results) == len(queries)
+        for query, query_results in zip(queries, results):
+            assert query_results == retriever.search_text(query, k=3)
@@ -0,0 +1,264 @@
+"""Unit tests for FAISS retriever (fake encoder, no model downloads)."""
+
+import threading
+import pytest
+import numpy as np
+
+# Skip the module at collection time when the search stack isn't installed
+faiss = pytest.importorskip("faiss")
+pytest.importorskip("sentence_transformers")
+
+import hack.retriever as retriever_module  # noqa: E402
+from hack.retriever import FaissRetriever, MockRetriever  # noqa: E402
+from tests.hack.helpers import warm_query_cache  # noqa: E402
+
+
+class TestWorkspaceFormats:
+    """Tests for loading blocks from the different workspace JSON formats."""
+
+    @pytest.fixture(autouse=True)
+    def no_model(self, monkeypatch):
+        """Skip loading the sentence-transformers model."""
+        monkeypatch.setattr(retriever_module, "get_encoder", lambda model_name: None)
+
+    def test_lean_workspace_matches_legacy_json(self):
+        """Test that the workspace without inlined embeddings yields the same blocks as the legacy JSON."""
+        legacy = FaissRetriever(
+            faiss_index_path="experiments/chess_pdf.faiss",
+            workspace_json_path="experiments/workspace_with_embeddings.json",
+        )
+        binary = FaissRetriever(
+            faiss_index_path="experiments/chess_pdf.faiss",
+            workspace_json_path="experiments/chess_pdf_workspace.json",
+        )
+        assert binary.blocks == legacy.blocks
+        assert len(binary.blocks) == binary.index.ntotal
+
+    def test_committed_index_uses_inner_product(self):
+        """Test that the chess index scores by inner product over unit vectors."""
+        retriever = FaissRetriever(
+            faiss_index_path="experiments/chess_pdf.faiss",
+            workspace_json_path="experiments/chess_pdf_workspace.json",
+        )
+        assert retriever.index.metric_type == faiss.METRIC_INNER_PRODUCT
+        norms = np.linalg.norm(retriever.index.reconstruct_n(0, retriever.index.ntotal), axis=1)
+        np.testing.assert_allclose(norms, 1.0, atol=1e-5)
+
+    def test_mmap_index_matches_loaded_index(self):
+        """Test that a memory-mapped index returns the same neighbors as a loaded one."""
+        loaded = FaissRetriever(
+            faiss_index_path="experiments/chess_pdf.faiss",
+            workspace_json_path="experiments/chess_pdf_workspace.json",
+        )
+        mapped = FaissRetriever(
+            faiss_index_path="experiments/chess_pdf.faiss",
+            workspace_json_path="experiments/chess_pdf_workspace.json",
+            mmap=True,
+        )
+        queries = loaded.index.reconstruct_n(0, 3)
+        _, expected = loaded.index.search(queries, 5)
+        _, indices = mapped.index.search(queries, 5)
+        np.testing.assert_array_equal(indices, expected)
+
+
+class TestLoadJson:
+    """Tests for _load_json helper."""
+
+    def test_stdlib_fallback_matches_orjson(self, tmp_path, monkeypatch):
+        """Test that parsing without orjson gives the same data."""
+        path = tmp_path / "workspace.json"
+        path.write_text('{"blocks": [{"text": "caf\\u00e9", "bbox": [0.5, 1e-3]}], "embedding_rows": [null]}')
+        parsed = retriever_module._load_json(path)
+        monkeypatch.setattr(retriever_module, "orjson", None)
+        assert retriever_module._load_json(path) == parsed
+        assert parsed["blocks"][0]["text"] == "café"
+
+
+class TestSearchResults:
+    """Tests for the format and invariants of search results."""
+
+    def test_search_result_format(self, fake_retriever):
+        """Test that search results have the expected format."""
+        results = fake_retriever.search_text("endgame strategy", k=1)
+        assert len(results) == 1
+
+        result = results[0]
+        assert "unit_id" in result
+        assert "content" in result
+        assert "page" in result
+        assert "section_path" in result
+        assert "bbox" in result
+        assert "type" in result
+        assert "similarity" in result
+
+    def test_results_are_plain_block_fields(self, fake_retriever):
+        """Test that fields gathered from the result columns match the blocks as plain Python values."""
+        blocks_by_text = {block["text"]: block for block in fake_retriever.blocks}
+        for result in fake_retriever.search_text("endgame strategy", k=5):
+            block = blocks_by_text[result["content"]]
+            assert result["unit_id"] == f"block_{block['page_num']}_{block['block_idx']}"
+            assert result["type"] == block["type"]
+            assert result["bbox"] == block["bbox"]
+            assert type(result["page"]) is int and type(result["similarity"]) is float
+
+    @pytest.mark.parametrize("method,query,k,min_len,max_len", [
+        ("search_text", "chess", 3, 3, 3),
+        ("search_all", "pawn structure", 5, 5, 5),
+        ("search_tables", "table data", 5, 4, 4),
+        ("search_images", "diagram", 5, 0, 0),
+    ])
+    def test_search_contract(self, fake_retriever, method, query, k, min_len, max_len):
+        """Test that each search method returns a list bounded by k and the matching blocks."""
+        results = getattr(fake_retriever, method)(query, k=k)
+        assert isinstance(results, list)
+        assert min_len <= len(results) <= max_len
+
+    def test_similarity_scores_are_valid(self, fake_retriever):
+        """Test that similarity scores are between 0 and 1."""
+        results = fake_retriever.search_text("checkmate", k=5)
+        for result in results:
+            assert 0 <= result["similarity"] <= 1
+
+
+class TestQueryCache:
+    """Tests for caching of encoded queries."""
+
+    def test_repeated_queries_are_encoded_once(self, fake_retriever):
+        """Test that only unseen queries reach the model."""
+        first = fake_retriever.search_text("pawn", k=2)
+        fake_retriever.search_multi(["pawn", "rook", "rook"], k=2)
+        assert fake_retriever.model.encoded == ["pawn", "rook"]
+        assert fake_retriever.search_text("pawn", k=2) == first
+
+    def test_cache_evicts_least_recently_used(self, fake_retriever, monkeypatch):
+        """Test that the cache is bounded by QUERY_CACHE_SIZE."""
+        monkeypatch.setattr(retriever_module, "QUERY_CACHE_SIZE", 2)
+        fake_retriever.search_multi(["a", "b"], k=1)
+        fake_retriever.search_text("a", k=1)
+        fake_retriever.search_text("c", k=1)
+        assert list(fake_retriever._query_cache) == ["a", "c"]
+
+    def test_encodes_outside_the_cache_lock(self, fake_retriever, monkeypatch):
+        """Test that a search can finish while another thread is still encoding."""
+        started, release = threading.Event(), threading.Event()
+        encode = fake_retriever.model.encode
+
+        def slow_encode(texts, **kwargs):
+            if "slow" in texts:
+                started.set()
+                release.wait(5)
+            return encode(texts, **kwargs)
+
+        monkeypatch.setattr(fake_retriever.model, "encode", slow_encode)
+        slow = threading.Thread(target=fake_retriever.search_text, args=("slow",))
+        fast = threading.Thread(target=fake_retriever.search_text, args=("fast",))
+        slow.start()
+        assert started.wait(5)
+        fast.start()
+        fast.join(timeout=2)
+        finished_while_encoding = not fast.is_alive()
+
+        release.set()
+        slow.join()
+        fast.join()
+        assert finished_while_encoding
+        assert set(fake_retriever._query_cache) == {"slow", "fast"}
+
+    def test_encodings_are_contiguous_float32(self, fake_retriever, monkeypatch):
+        """Test that encoder output of another dtype or layout is coerced for FAISS."""
+        encode = fake_retriever.model.encode
+        monkeypatch.setattr(
+            fake_retriever.model, "encode",
+            lambda texts, **kwargs: np.asfortranarray(encode(texts).astype(np.float64)),
+        )
+        embeddings = fake_retriever._encode_queries(["pawn", "rook"])
+        assert embeddings.dtype == np.float32
+        assert embeddings.flags["C_CONTIGUOUS"]
+        assert len(fake_retriever.search_text("pawn", k=3)) == 3
+
+
+class TestTypeFilter:
+    """Tests for block type filtered searches."""
+
+    def test_type_filter_searches_only_that_type(self, fake_retriever):
+        """Test that filtered searches return all and only blocks of the requested type."""
+        results = fake_retriever.search_tables("pawn", k=5)
+        assert sorted(r["unit_id"] for r in results) == ["block_0_1", "block_1_5", "block_2_9", "block_3_13"]
+        assert all(r["type"] == "table" for r in results)
+
+    def test_mixed_filters_in_one_batch(self, fake_retriever):
+        """Test that search_multi applies each query's own filter."""
+        tables, unfiltered = fake_retriever.search_multi(["pawn", "pawn"], k=4, block_types=["table", None])
+        assert {r["type"] for r in tables} == {"table"}
+        assert len(unfiltered) == 4
+
+    def test_missing_type_returns_empty_without_encoding(self, fake_retriever):
+        """Test that types absent from the document skip encoding and search."""
+        assert fake_retriever.search_images("diagram") == []
+        assert fake_retriever.model.encoded == []
+
+
+class TestWarmQueryCache:
+    """Tests for the on-disk query embedding cache used by the session retriever."""
+
+    def test_second_warm_loads_from_disk(self, fake_retriever, tmp_path):
+        """Test that cached embeddings are saved once and reused without encoding."""
+        warm_query_cache(fake_retriever, ["pawn", "rook"], tmp_path)
+        assert len(list(tmp_path.glob("*.npy"))) == 2
+        expected = fake_retriever._encode_queries(["pawn", "rook"])
+
+        fake_retriever._query_cache.clear()
+        fake_retriever.model.encoded.clear()
+        warm_query_cache(fake_retriever, ["pawn", "rook"], tmp_path)
+        assert fake_retriever.model.encoded == []
+        np.testing.assert_array_equal(fake_retriever._encode_queries(["pawn", "rook"]), expected)
+
+
+class TestCheckFaissSimd:
+    """Tests for the FAISS SIMD build check."""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        """Re-run the check in every test."""
+        retriever_module._check_faiss_simd.cache_clear()
+        yield
+        retriever_module._check_faiss_simd.cache_clear()
+
+    def test_warns_for_generic_build_on_avx2_cpu(self, monkeypatch):
+        """Test that a generic FAISS build on an AVX2 CPU is reported as a warning."""
+        monkeypatch.setattr(retriever_module.faiss, "supported_instruction_sets", lambda: {"AVX2", "SSE42"})
+        monkeypatch.setattr(retriever_module.faiss, "get_compile_options", lambda: "OPTIMIZE GENERIC ")
+        with pytest.warns(RuntimeWarning, match="AVX2"):
+            assert retriever_module._check_faiss_simd() is False
+
+    def test_accepts_avx2_build(self, monkeypatch):
+        """Test that an AVX2-enabled build passes."""
+        monkeypatch.setattr(retriever_module.faiss, "supported_instruction_sets", lambda: {"AVX2"})
+        monkeypatch.setattr(retriever_module.faiss, "get_compile_options", lambda: "OPTIMIZE DD AVX2 AVX512 ")
+        assert retriever_module._check_faiss_simd() is True
+
+
+class TestMockRetriever:
+    """Tests for MockRetriever class."""
+
+    def test_mock_retriever_exists(self):
+        """Test that MockRetriever can be imported."""
+        mock = MockRetriever()
+        assert mock is not None
+
+    def test_mock_search_text_returns_mock_data(self):
+        """Test that mock retriever returns the data it was seeded with."""
+        data = [{"unit_id": "seeded_1", "content": "Seeded result", "page": 3, "section_path": "2.1", "bbox": []}]
+        mock = MockRetriever(data=data)
+        assert mock.search_text("test query") == data
+        assert mock.search_multi(["a", "b"]) == [data, data]
+
+    def test_mock_search_multi_filters_out_typed_queries(self):
+        """Test that type-filtered mock queries return nothing, like the mock's table/image searches."""
+        mock = MockRetriever()
+        assert mock.search_multi(["a", "b"], block_types=[None, "table"]) == [mock.data, []]
+
+    def test_mock_defaults_to_one_result(self):
+        """Test that an unseeded mock returns a single default block."""
+        results = MockRetriever().search_text("test query")
+        assert len(results) == 1